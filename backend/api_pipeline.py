@@ -6,28 +6,51 @@ Perfect for Flask/FastAPI integration
 
 import sys
 import os
-sys.path.insert(0, os.path.dirname(__file__))
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if _BACKEND_DIR not in sys.path:
+    sys.path.insert(0, _BACKEND_DIR)
 
 
 from production_entity_extractor import ProductionEntityExtractor
-from menu_loader import MenuLoader
-from fuzzy_matcher import FuzzyMenuMatcher
+from menu_loader import get_menu
+from fuzzy_matcher import FuzzyMenuMatcher, DEFAULT_MODEL_NAME
 from order_builder import OrderBuilder
+from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor
 import json
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 class APIPipeline:
     """Production pipeline that returns structured JSON"""
     
     def __init__(self):
-        """Initialize all components"""
-        self.extractor = ProductionEntityExtractor(
-            model_id="meta.llama3-1-8b-instruct-v1:0"
-        )
-        self.menu = MenuLoader()
-        self.matcher = FuzzyMenuMatcher(self.menu)
+        """Initialize all components
+        
+        The Bedrock extractor is created on first use; the shared menu and
+        the sentence transformer load concurrently.
+        """
+        self._extractor = None
+        self._extractor_id = "meta.llama3-1-8b-instruct-v1:0"
+        
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            menu_future = pool.submit(get_menu)
+            model_future = pool.submit(SentenceTransformer, DEFAULT_MODEL_NAME)
+            self.menu = menu_future.result()
+            model = model_future.result()
+        
+        self.matcher = FuzzyMenuMatcher(self.menu, model=model)
         self.builder = OrderBuilder(self.menu)
     
+    @property
+    def extractor(self) -> ProductionEntityExtractor:
+        """Bedrock extractor, created on first use"""
+        if self._extractor is None:
+            self._extractor = ProductionEntityExtractor(
+                model_id=self._extractor_id,
+                product_names=[product.get('name', '') for product in self.menu.get_all_products()]
+            )
+        return self._extractor
+    
     def process_audio(self,stats) -> Dict:
         """Process audio file and return complete JSON result
         
@@ -68,85 +91,8 @@ class APIPipeline:
             }
             
             # Step 3: Match to menu
-            matched_items = []
-            unmatched_items = []
-            
-            for item in items:
-                match = self.matcher.match_best(
-                    item['product_hint'], 
-                    threshold=0.40
-                )
-                
-                if match and match.get('product'):
-                    # Valid match
-                    combined_confidence = (
-                        item['confidence'] + match['similarity']
-                    ) / 2
-                    
-                    matched_item = {
-                        'product': match['product'],
-                        'product_id': match['product_id'],
-                        'product_name': match['product_name'],
-                        'base_price': 5.50,
-                        'size': item['size'],
-                        'temperature': item['temperature'],
-                        'modifiers': item['modifiers'],
-                        'quantity': item['quantity'],
-                        'match_confidence': match['similarity'],
-                        'extraction_confidence': item['confidence'],
-                        'overall_confidence': combined_confidence,
-                        'exists': match.get('exists', True),
-                        'suggestions': match.get('suggestions', []),
-                        'original_query': item['product_hint']
-                    }
-                    
-                    matched_items.append(matched_item)
-                    
-                    # Flag low confidence
-                    if combined_confidence < 0.75:
-                        result["flags"].append({
-                            "item": match['product_name'],
-                            "reason": "low_confidence",
-                            "confidence": combined_confidence,
-                            "action": "review"
-                        })
-                
-                elif match and not match.get('product'):
-                    # Known unknown product
-                    unmatched_items.append({
-                        'product_name': item['product_hint'],
-                        'size': item['size'],
-                        'temperature': item['temperature'],
-                        'modifiers': item['modifiers'],
-                        'quantity': item['quantity'],
-                        'suggestions': match.get('suggestions', []),
-                        'original_query': item['product_hint']
-                    })
-                    
-                    result["flags"].append({
-                        "item": item['product_hint'],
-                        "reason": "not_in_menu",
-                        "suggestions": match.get('suggestions', []),
-                        "action": "manual_selection"
-                    })
-                else:
-                    # No match at all
-                    unmatched_items.append({
-                        'product_name': item['product_hint'],
-                        'size': item['size'],
-                        'temperature': item['temperature'],
-                        'modifiers': item['modifiers'],
-                        'quantity': item['quantity'],
-                        'suggestions': [],
-                        'original_query': item['product_hint']
-                    })
-                    
-                    result["flags"].append({
-                        "item": item['product_hint'],
-                        "reason": "no_match",
-                        "suggestions": [],
-                        "action": "manual_entry"
-                    })
+            matched_items, unmatched_items, flags = self._process_items(items)
+            result["flags"].extend(flags)
             
             result["matching"] = {
                 "matched_count": len(matched_items),
@@ -204,46 +150,14 @@ class APIPipeline:
             }
             
             # Match to menu
-            matched_items = []
-            
-            for item in items:
-                match = self.matcher.match_best(
-                    item['product_hint'], 
-                    threshold=0.40
-                )
-                
-                if match and match.get('product'):
-                    combined_confidence = (
-                        item['confidence'] + match['similarity']
-                    ) / 2
-                    
-                    matched_items.append({
-                        'product': match['product'],
-                        'product_id': match['product_id'],
-                        'product_name': match['product_name'],
-                        'base_price': 5.50,
-                        'size': item['size'],
-                        'temperature': item['temperature'],
-                        'modifiers': item['modifiers'],
-                        'quantity': item['quantity'],
-                        'match_confidence': match['similarity'],
-                        'extraction_confidence': item['confidence'],
-                        'overall_confidence': combined_confidence,
-                        'exists': match.get('exists', True),
-                        'suggestions': match.get('suggestions', []),
-                        'original_query': item['product_hint']
-                    })
-                    
-                    if combined_confidence < 0.75:
-                        result["flags"].append({
-                            "item": match['product_name'],
-                            "reason": "low_confidence",
-                            "confidence": combined_confidence
-                        })
+            matched_items, unmatched_items, flags = self._process_items(items)
+            result["flags"].extend(flags)
             
             result["matching"] = {
                 "matched_count": len(matched_items),
-                "matched_items": matched_items
+                "unmatched_count": len(unmatched_items),
+                "matched_items": matched_items,
+                "unmatched_items": unmatched_items
             }
             
             # Build order
@@ -256,6 +170,96 @@ class APIPipeline:
             result["error"] = str(e)
         
         return result
+    
+    def _process_items(self, items: List[Dict]) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Match extracted items to the menu in one batched pass
+        
+        Args:
+            items: Items from the entity extractor
+            
+        Returns:
+            (matched_items, unmatched_items, flags)
+        """
+        matched_items = []
+        unmatched_items = []
+        flags = []
+        
+        best_matches = self.matcher.match_best_batch(
+            [item['product_hint'] for item in items],
+            threshold=0.40
+        )
+        
+        for item, match in zip(items, best_matches):
+            if match and match.get('product'):
+                # Valid match
+                combined_confidence = (
+                    item['confidence'] + match['similarity']
+                ) / 2
+                
+                matched_items.append({
+                    'product': match['product'],
+                    'product_id': match['product_id'],
+                    'product_name': match['product_name'],
+                    'base_price': 5.50,
+                    'size': item['size'],
+                    'temperature': item['temperature'],
+                    'modifiers': item['modifiers'],
+                    'quantity': item['quantity'],
+                    'match_confidence': match['similarity'],
+                    'extraction_confidence': item['confidence'],
+                    'overall_confidence': combined_confidence,
+                    'exists': match.get('exists', True),
+                    'suggestions': match.get('suggestions', []),
+                    'original_query': item['product_hint']
+                })
+                
+                # Flag low confidence
+                if combined_confidence < 0.75:
+                    flags.append({
+                        "item": match['product_name'],
+                        "reason": "low_confidence",
+                        "confidence": combined_confidence,
+                        "action": "review"
+                    })
+            
+            elif match and not match.get('product'):
+                # Known unknown product
+                unmatched_items.append({
+                    'product_name': item['product_hint'],
+                    'size': item['size'],
+                    'temperature': item['temperature'],
+                    'modifiers': item['modifiers'],
+                    'quantity': item['quantity'],
+                    'suggestions': match.get('suggestions', []),
+                    'original_query': item['product_hint']
+                })
+                
+                flags.append({
+                    "item": item['product_hint'],
+                    "reason": "not_in_menu",
+                    "suggestions": match.get('suggestions', []),
+                    "action": "manual_selection"
+                })
+            else:
+                # No match at all
+                unmatched_items.append({
+                    'product_name': item['product_hint'],
+                    'size': item['size'],
+                    'temperature': item['temperature'],
+                    'modifiers': item['modifiers'],
+                    'quantity': item['quantity'],
+                    'suggestions': [],
+                    'original_query': item['product_hint']
+                })
+                
+                flags.append({
+                    "item": item['product_hint'],
+                    "reason": "no_match",
+                    "suggestions": [],
+                    "action": "manual_entry"
+                })
+        
+        return matched_items, unmatched_items, flags
 
 
 def test_api_pipeline():
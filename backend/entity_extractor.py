@@ -8,20 +8,20 @@ class EntityExtractor:
     def __init__(self):
         """Initialize entity extractor with patterns"""
         
-        # Size patterns
-        self.sizes = {
-            r'\b(small|sm|sml)\b': 'small',
-            r'\b(medium|med|md)\b': 'medium',
-            r'\b(large|lrg|lg)\b': 'large',
-            r'\b(kids?|kid size)\b': 'kids',
-        }
+        # Size patterns (compiled once; checked in priority order)
+        self.sizes = [
+            (re.compile(r'\b(small|sm|sml)\b'), 'small'),
+            (re.compile(r'\b(medium|med|md)\b'), 'medium'),
+            (re.compile(r'\b(large|lrg|lg)\b'), 'large'),
+            (re.compile(r'\b(kids?|kid size)\b'), 'kids'),
+        ]
         
         # Temperature patterns
-        self.temperatures = {
-            r'\b(hot)\b': 'hot',
-            r'\b(iced|ice|cold)\b': 'iced',
-            r'\b(blended|frozen|freeze)\b': 'blended',
-        }
+        self.temperatures = [
+            (re.compile(r'\b(hot)\b'), 'hot'),
+            (re.compile(r'\b(iced|ice|cold)\b'), 'iced'),
+            (re.compile(r'\b(blended|frozen|freeze)\b'), 'blended'),
+        ]
         
         # Common modifiers
         self.modifiers = [
@@ -49,15 +49,53 @@ class EntityExtractor:
             # Blend
             r'double blended', r'extra thick',
         ]
+        # All modifiers in one alternation so a segment is scanned once.
+        # Modifiers are plain phrases, so a phrase that contains another
+        # ("whipped cream" / "whip") implies the shorter one is present too.
+        self._modifier_re = re.compile(
+            '|'.join(f'(?P<m{i}>{p})' for i, p in enumerate(self.modifiers))
+        )
+        self._modifier_implies = [
+            [j for j, other in enumerate(self.modifiers) if j != i and other in p]
+            for i, p in enumerate(self.modifiers)
+        ]
         
         # Quantity words
-        self.quantities = {
-            r'\b(one|a|an)\b': 1,
-            r'\b(two|couple)\b': 2,
-            r'\b(three)\b': 3,
-            r'\b(four)\b': 4,
-            r'\b(five)\b': 5,
-        }
+        self.quantities = [
+            (re.compile(r'\b(one|a|an)\b'), 1),
+            (re.compile(r'\b(two|couple)\b'), 2),
+            (re.compile(r'\b(three)\b'), 3),
+            (re.compile(r'\b(four)\b'), 4),
+            (re.compile(r'\b(five)\b'), 5),
+        ]
+        
+        # Product name hints (earlier entries win over later ones)
+        self.product_patterns = [
+            r'golden eagle',
+            r'white chocolate mocha',
+            r'caramelizer',
+            r'rainbow rebel',
+            r'rainbro rebel',
+            r'rebel',
+            r'mocha',
+            r'latte',
+            r'freeze',
+            r'americano',
+            r'cold brew',
+            r'not so hot',
+        ]
+        self._product_re = re.compile(
+            '|'.join(f'(?P<p{i}>{p})' for i, p in enumerate(self.product_patterns))
+        )
+        self._skip_words = frozenset(['i', 'a', 'an', 'the', 'can', 'get', 'have', 'with', 'and'])
+        
+        # Item separators, applied in order (each pass sees the previous
+        # pass's ' ||| ' markers, so they cannot be merged into one regex)
+        self._segment_separators = [
+            re.compile(r'\s+and\s+(a|an|also)\s+'),
+            re.compile(r'\s+also\s+'),
+            re.compile(r'\s+and\s+'),
+        ]
     
     def extract(self, text: str, verbose=False) -> List[Dict]:
         """Extract all entities from text"""
@@ -98,72 +136,60 @@ class EntityExtractor:
     
     def _segment_items(self, text: str) -> List[str]:
         """Split text into individual item segments"""
-        text = re.sub(r'\s+and\s+(a|an|also)\s+', ' ||| ', text)
-        text = re.sub(r'\s+also\s+', ' ||| ', text)
-        text = re.sub(r'\s+and\s+', ' ||| ', text)
+        # Separators can only match if one of these words is present
+        if 'and' in text or 'also' in text:
+            for separator in self._segment_separators:
+                text = separator.sub(' ||| ', text)
         
-        segments = [s.strip() for s in text.split('|||')]
-        segments = [s for s in segments if len(s.split()) >= 3]
+        segments = [s for s in (part.strip() for part in text.split('|||')) if len(s.split()) >= 3]
         
         return segments if segments else [text]
     
     def _extract_size(self, text: str) -> Optional[str]:
         """Extract size from text"""
-        for pattern, size in self.sizes.items():
-            if re.search(pattern, text):
+        for pattern, size in self.sizes:
+            if pattern.search(text):
                 return size
         return None
     
     def _extract_temperature(self, text: str) -> Optional[str]:
         """Extract temperature from text"""
-        for pattern, temp in self.temperatures.items():
-            if re.search(pattern, text):
+        for pattern, temp in self.temperatures:
+            if pattern.search(text):
                 return temp
         return None
     
     def _extract_modifiers(self, text: str) -> List[str]:
         """Extract modifiers from text"""
-        found_modifiers = []
+        found = set()
         
-        for modifier_pattern in self.modifiers:
-            if re.search(modifier_pattern, text):
-                match = re.search(modifier_pattern, text)
-                found_modifiers.append(match.group(0))
+        for match in self._modifier_re.finditer(text):
+            index = int(match.lastgroup[1:])
+            found.add(index)
+            found.update(self._modifier_implies[index])
         
-        return found_modifiers
+        return [self.modifiers[i] for i in sorted(found)]
     
     def _extract_quantity(self, text: str) -> int:
         """Extract quantity from text"""
-        for pattern, qty in self.quantities.items():
-            if re.search(pattern, text):
+        for pattern, qty in self.quantities:
+            if pattern.search(text):
                 return qty
         return 1
     
     def _extract_product_hint(self, text: str) -> Optional[str]:
         """Extract product name hints from text"""
-        product_patterns = [
-            r'golden eagle',
-            r'white chocolate mocha',
-            r'caramelizer',
-            r'rainbow rebel',
-            r'rainbro rebel',
-            r'rebel',
-            r'mocha',
-            r'latte',
-            r'freeze',
-            r'americano',
-            r'cold brew',
-            r'not so hot',
-        ]
+        best = None
+        for match in self._product_re.finditer(text):
+            index = int(match.lastgroup[1:])
+            if best is None or index < best[0]:
+                best = (index, match.group(0))
         
-        for pattern in product_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(0)
+        if best:
+            return best[1]
         
         words = text.split()
-        skip_words = ['i', 'a', 'an', 'the', 'can', 'get', 'have', 'with', 'and']
-        meaningful_words = [w for w in words if w not in skip_words and len(w) > 2]
+        meaningful_words = [w for w in words if len(w) > 2 and w not in self._skip_words]
         
         if meaningful_words:
             return ' '.join(meaningful_words[:3])
@@ -1,36 +1,106 @@
 # src/fuzzy_matcher.py
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from fuzzywuzzy import fuzz
-from typing import List, Dict, Optional
-import pickle
+from rapidfuzz import fuzz, process, utils
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+import hashlib
+import json
 import os
+import string
+import threading
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Resolved once per process instead of on every matcher construction
+try:
+    from product_variations import resolve_product as _resolve_product, UNKNOWN_PRODUCTS as _UNKNOWN_PRODUCTS
+except Exception as e:
+    print(f"⚠️ Could not load variations: {e}")
+    _resolve_product = None
+    _UNKNOWN_PRODUCTS = {}
+
+# Bump when the cached embedding format changes
+# (v2: L2-normalized rows, v3: .npy matrix + JSON metadata instead of pickle)
+EMBEDDINGS_CACHE_VERSION = 3
+EMBEDDINGS_CACHE_FILE = 'data/menu/embeddings_cache.npy'
+EMBEDDINGS_META_FILE = 'data/menu/embeddings_cache.json'
+
+DEFAULT_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# Below this many products an exact scan is cheaper than an ANN index
+ANN_MIN_PRODUCTS = 2000
+
+# Scores per (menu hash, model name, scored query, top_k, threshold),
+# shared by every matcher in the process: main.py builds a new pipeline per
+# session, and drive-thru hints repeat constantly across sessions
+MATCH_CACHE_SIZE = 2048
+_match_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_match_cache_lock = threading.Lock()
+
+
+_PUNCTUATION = str.maketrans('', '', string.punctuation)
+
+
+def _canon(query: str) -> str:
+    """Canonical form of a query for the nickname and unknown-product lookups.
+
+    Only a lookup key: scoring uses the query as typed (lowercased), since
+    menu names keep their punctuation ("9-1-1", "not-so-hot").
+    """
+    return ' '.join(query.lower().translate(_PUNCTUATION).split())
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, best first (O(N) selection, then sorts only k)."""
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= len(scores):
+        return np.argsort(scores)[::-1]
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(scores[top])[::-1]]
+
 
 class FuzzyMenuMatcher:
     """Match product names to menu items using fuzzy + semantic similarity."""
 
-    def __init__(self, menu_loader, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, menu_loader, model_name: str = DEFAULT_MODEL_NAME,
+                 model: Optional[SentenceTransformer] = None):
         """
         Args:
             menu_loader: MenuLoader instance
             model_name: Sentence transformer model name
+            model: Already-loaded sentence transformer (skips loading model_name)
         """
         self.menu_loader = menu_loader
         self.products = menu_loader.get_all_products()
+        self.model_name = model_name
 
-        print(f"⏳ Loading sentence transformer model '{model_name}'...")
-        self.model = SentenceTransformer(model_name)
+        if model is None:
+            print(f"⏳ Loading sentence transformer model '{model_name}'...")
+            model = SentenceTransformer(model_name)
+        self.model = model
+        self._use_half_precision()
         print("✅ Model loaded!")
 
+        # Menu and model part of the shared score cache key, set by _build_embeddings
+        self._cache_namespace = None
+
         # Build embeddings
         self.embeddings = None
         self.product_names: List[str] = []
         self._build_embeddings()
+        self._build_index()
+        self._build_color_masks()
 
         # Common nicknames/aliases (extend as needed)
         # If your menu uses size-specific names (e.g., "Not So Hot 24oz"),
         # update the mapping to the exact product name.
+        # Keys must already be in _canon() form.
         self.nicknames = {
             'rainbro': 'rainbro rebel',
             'rainbow': 'rainbro rebel',
@@ -45,21 +115,32 @@ class FuzzyMenuMatcher:
         # Optional variation resolver (safe fallback if not present)
         self._load_variations()
 
+    def _use_half_precision(self):
+        """Run the encoder in FP16 on GPU, or BF16 on CPU when MATCHER_BF16=1.
+
+        BF16 is opt-in on CPU because it only pays off with native support
+        (AVX512-BF16/AMX); elsewhere it is emulated and slower than FP32.
+        """
+        if torch.cuda.is_available():
+            self.model = self.model.to('cuda').half()
+            print("   Using FP16 on GPU")
+        elif os.getenv('MATCHER_BF16') == '1':
+            self.model = self.model.to(torch.bfloat16)
+            print("   Using BF16 on CPU")
+
     def _load_variations(self):
         """Load product variation resolver if available."""
-        try:
-            import sys
-            sys.path.insert(0, os.path.dirname(__file__))
-            from product_variations import resolve_product
-            self.resolve_product = resolve_product
-        except Exception as e:
-            print(f"⚠️ Could not load variations: {e}")
+        self._unknown = _UNKNOWN_PRODUCTS
+        if _resolve_product is not None:
+            self.resolve_product = _resolve_product
+        else:
             # identity: returns (query, True, [])
             self.resolve_product = lambda x: (x, True, [])
 
     def _build_embeddings(self):
         """Build or load embeddings for all products."""
         print(f"🔨 Building embeddings for {len(self.products)} products...")
+        self._cache_namespace = None
 
         if len(self.products) == 0:
             print("⚠️ No products loaded! Cannot build embeddings.")
@@ -67,22 +148,28 @@ class FuzzyMenuMatcher:
             self.embeddings = None
             return
 
-        cache_file = 'data/menu/embeddings_cache.pkl'
+        menu_hash = self._menu_hash()
+        self._cache_namespace = (menu_hash, self.model_name)
 
-        if os.path.exists(cache_file):
+        if os.path.exists(EMBEDDINGS_CACHE_FILE) and os.path.exists(EMBEDDINGS_META_FILE):
             print("   Checking cache...")
             try:
-                with open(cache_file, 'rb') as f:
-                    cache = pickle.load(f)
-                cached_count = len(cache.get('names', []))
+                with open(EMBEDDINGS_META_FILE, 'r') as f:
+                    meta = json.load(f)
+                cached_count = meta.get('count', 0)
                 current_count = len(self.products)
-                if cached_count == current_count:
-                    self.product_names = cache['names']
-                    self.embeddings = cache['embeddings']
+                if meta.get('version') != EMBEDDINGS_CACHE_VERSION:
+                    print("⚠️ Cache format outdated (rebuilding)")
+                elif cached_count != current_count:
+                    print(f"⚠️ Cache mismatch: {cached_count} vs {current_count} (rebuilding)")
+                elif meta.get('menu_hash') != menu_hash:
+                    print("⚠️ Cache mismatch: menu changed (rebuilding)")
+                else:
+                    self.product_names = meta['names']
+                    # Memory-mapped: pages are faulted in on first use
+                    self.embeddings = np.load(EMBEDDINGS_CACHE_FILE, mmap_mode='r')
                     print(f"✅ Loaded {len(self.product_names)} embeddings from cache")
                     return
-                else:
-                    print(f"⚠️ Cache mismatch: {cached_count} vs {current_count} (rebuilding)")
             except Exception as e:
                 print(f"⚠️ Cache error: {e} (rebuilding)")
 
@@ -98,22 +185,57 @@ class FuzzyMenuMatcher:
 
         # Generate embeddings
         print("   Generating embeddings...")
-        self.embeddings = self.model.encode(
+        embeddings = self.model.encode(
             self.product_names,
             show_progress_bar=True,
             convert_to_numpy=True
         )
+        # Unit-length rows turn cosine similarity into a plain dot product;
+        # keep the table float32 and C-contiguous so scoring stays one sgemv
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+        self.embeddings = np.ascontiguousarray(embeddings / norms, dtype=np.float32)
 
         # Cache
         try:
-            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-            with open(cache_file, 'wb') as f:
-                pickle.dump({'names': self.product_names, 'embeddings': self.embeddings}, f)
+            os.makedirs(os.path.dirname(EMBEDDINGS_CACHE_FILE), exist_ok=True)
+            np.save(EMBEDDINGS_CACHE_FILE, self.embeddings)
+            with open(EMBEDDINGS_META_FILE, 'w') as f:
+                json.dump({
+                    'version': EMBEDDINGS_CACHE_VERSION,
+                    'count': len(self.product_names),
+                    'menu_hash': menu_hash,
+                    'names': self.product_names,
+                }, f)
             print(f"✅ Built and cached {len(self.product_names)} embeddings")
         except Exception as e:
             print(f"⚠️ Could not cache embeddings: {e}")
             print(f"✅ Built {len(self.product_names)} embeddings (not cached)")
 
+    def _menu_hash(self) -> str:
+        """Fingerprint product IDs and names so a changed menu invalidates the cache."""
+        digest = hashlib.sha1()
+        for product in self.products:
+            digest.update(f"{product.get('chainproductid')}\t{product.get('name') or ''}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _build_index(self):
+        """Build an HNSW index over the embeddings for large menus (needs faiss)."""
+        self.index = None
+
+        if faiss is None or self.embeddings is None or len(self.product_names) < ANN_MIN_PRODUCTS:
+            return
+
+        index = faiss.IndexHNSWFlat(self.embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        index.add(self.embeddings)
+        self.index = index
+        print(f"✅ Built ANN index over {index.ntotal} embeddings")
+
+    def _build_color_masks(self):
+        """Flag product names by color once so the contradiction penalty is vectorized."""
+        self._has_white = np.array(['white' in n for n in self.product_names], dtype=bool)
+        self._has_dark = np.array(['dark' in n for n in self.product_names], dtype=bool)
+        self._has_double_choc = np.array(['double chocolate' in n for n in self.product_names], dtype=bool)
+
     def match(self, query: str, top_k=5, threshold=0.5) -> List[Dict]:
         """Match query to menu items
         
@@ -128,67 +250,144 @@ class FuzzyMenuMatcher:
         if not query:
             return []
         
+        return self._match_key(self._normalize_query(query), top_k, threshold)
+
+    def _normalize_query(self, query: str, canon: Optional[str] = None) -> str:
+        """Scoring string for a query: its nickname target, or the query lowercased"""
+        if canon is None:
+            canon = _canon(query)
+        return self.nicknames.get(canon) or query.lower().strip()
+
+    def _match_key(self, key: str, top_k: int, threshold: float,
+                   query_embedding: Optional[np.ndarray] = None) -> List[Dict]:
+        """Match an already-normalized query, rebuilding result dicts from cached scores
+
+        query_embedding, when given, is the key's embedding encoded ahead of time.
+        """
         if self.embeddings is None or len(self.product_names) == 0:
             print("⚠️ No embeddings available for matching!")
             return []
         
-        query_lower = query.lower().strip()
-        
-        # Check for nicknames first
-        if query_lower in self.nicknames:
-            query_lower = self.nicknames[query_lower]
+        matches = []
+        for idx, score, semantic_score, fuzzy_score in self._match_cached(key, top_k, threshold, query_embedding):
+            product = self.products[idx]
+            
+            matches.append({
+                'product': product,
+                'product_name': product.get('name'),
+                'product_id': product.get('chainproductid'),
+                'similarity': score,
+                'semantic_score': semantic_score,
+                'fuzzy_score': fuzzy_score,
+                'base_price': product.get('cost', 0)
+            })
         
-        # 1. Semantic similarity (embeddings)
-        query_embedding = self.model.encode([query_lower])
-        semantic_scores = cosine_similarity(
-            query_embedding,
-            self.embeddings
-        )[0]
+        return matches
+
+    def _match_cached(self, query_lower: str, top_k: int, threshold: float,
+                      query_embedding: Optional[np.ndarray] = None) -> Tuple[Tuple[int, float, float, float], ...]:
+        """_match_uncached() through the process-wide score cache"""
+        cache_key = (self._cache_namespace, query_lower, top_k, threshold)
+        with _match_cache_lock:
+            scored = _match_cache.get(cache_key)
+            if scored is not None:
+                _match_cache.move_to_end(cache_key)
+                return scored
         
-        # 2. Fuzzy string matching
-        fuzzy_scores = []
-        for product_name in self.product_names:
-            # Combine multiple fuzzy metrics
-            ratio = fuzz.ratio(query_lower, product_name) / 100.0
-            partial = fuzz.partial_ratio(query_lower, product_name) / 100.0
-            token_sort = fuzz.token_sort_ratio(query_lower, product_name) / 100.0
-            
-            # Weighted average
-            score = 0.4 * ratio + 0.3 * partial + 0.3 * token_sort
-            fuzzy_scores.append(score)
+        scored = self._match_uncached(query_lower, top_k, threshold, query_embedding)
+        with _match_cache_lock:
+            _match_cache[cache_key] = scored
+            if len(_match_cache) > MATCH_CACHE_SIZE:
+                _match_cache.popitem(last=False)
+        return scored
+
+    def _match_uncached(self, query_lower: str, top_k: int, threshold: float,
+                        query_embedding: Optional[np.ndarray] = None) -> Tuple[Tuple[int, float, float, float], ...]:
+        """Score a normalized query against the menu
         
-        fuzzy_scores = np.array(fuzzy_scores)
+        Returns:
+            (product_index, similarity, semantic_score, fuzzy_score) tuples,
+            best first. Kept free of product dicts so results can be cached.
+        """
+        # 1. Semantic similarity (embeddings)
+        if query_embedding is None:
+            query_embedding = self.model.encode(
+                [query_lower],
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )[0]
+        # Half-precision models may hand back float16; score in float32
+        query_embedding = query_embedding.astype(np.float32, copy=False)
+
+        if self.index is not None:
+            # Large menu: only the nearest neighbours go on to fuzzy scoring
+            sims, ids = self.index.search(query_embedding[None, :], max(top_k * 4, 32))
+            keep = ids[0] >= 0
+            candidates = ids[0][keep]
+            semantic_scores = sims[0][keep]
+            names = [self.product_names[i] for i in candidates]
+        else:
+            candidates = None
+            semantic_scores = self.embeddings @ query_embedding
+            names = self.product_names
         
-        # 3. COLOR CONTRADICTION PENALTY (ADD THIS ENTIRE SECTION)
-        color_penalty = np.zeros(len(self.product_names))
+        # 2. COLOR CONTRADICTION PENALTY
+        color_penalty = np.zeros(len(names))
         
         query_words = set(query_lower.split())
         
+        has_white, has_dark, has_double_choc = self._has_white, self._has_dark, self._has_double_choc
+        if candidates is not None:
+            has_white, has_dark, has_double_choc = has_white[candidates], has_dark[candidates], has_double_choc[candidates]
+        
         # Define contradictory color pairs
         if 'white' in query_words:
-            for i, product_name in enumerate(self.product_names):
-                if 'dark' in product_name.lower():
-                    color_penalty[i] = -1.0  # Heavy penalty
-                elif 'double chocolate' in product_name.lower():
-                    color_penalty[i] = -0.8  # Penalty
+            color_penalty[has_double_choc] = -0.8  # Penalty
+            color_penalty[has_dark] = -1.0  # Heavy penalty
         
         if 'dark' in query_words:
-            for i, product_name in enumerate(self.product_names):
-                if 'white' in product_name.lower():
-                    color_penalty[i] = -1.0  # Heavy penalty
+            color_penalty[has_white] = -1.0  # Heavy penalty
         
-        # 4. Combined score WITH color penalty
-        combined_scores = 0.6 * semantic_scores + 0.4 * fuzzy_scores + color_penalty
-
+        # Combined score so far (accumulated in place)
+        combined_scores = color_penalty
+        combined_scores += 0.6 * semantic_scores
+        
+        # 3. Fuzzy string matching (one C-level batch per metric).
+        # Fuzzy adds at most 0.4, so products that stay under the threshold
+        # even with a perfect fuzzy score are never scored.
+        reachable = np.flatnonzero(combined_scores + 0.4 >= threshold)
+        fuzzy_scores = np.zeros(len(names))
         
+        if len(reachable):
+            if len(reachable) < len(names):
+                reachable_names = [names[i] for i in reachable]
+            else:
+                reachable_names = names
+            
+            queries = [query_lower]
+            ratio = process.cdist(queries, reachable_names, scorer=fuzz.ratio)[0] / 100.0
+            partial = process.cdist(queries, reachable_names, scorer=fuzz.partial_ratio)[0] / 100.0
+            token_sort = process.cdist(
+                queries, reachable_names,
+                scorer=fuzz.token_sort_ratio,
+                processor=utils.default_process,
+            )[0] / 100.0
+            
+            # Weighted average
+            fuzzy_scores[reachable] = 0.4 * ratio + 0.3 * partial + 0.3 * token_sort
+        
+        # 4. Combined score WITH color penalty
+        combined_scores += 0.4 * fuzzy_scores
         
         # Get top matches
-        top_indices = np.argsort(combined_scores)[::-1][:top_k]
+        top_indices = _top_k_indices(combined_scores, top_k)
         
-        matches = []
+        scored = []
         for idx in top_indices:
+            product_idx = int(idx if candidates is None else candidates[idx])
+            
             # Bounds check
-            if idx >= len(self.products):
+            if product_idx >= len(self.products):
                 continue
             
             score = combined_scores[idx]
@@ -197,19 +396,14 @@ class FuzzyMenuMatcher:
             if score < threshold:
                 continue
             
-            product = self.products[idx]
-            
-            matches.append({
-                'product': product,
-                'product_name': product.get('name'),
-                'product_id': product.get('chainproductid'),
-                'similarity': float(score),
-                'semantic_score': float(semantic_scores[idx]),
-                'fuzzy_score': float(fuzzy_scores[idx]),
-                'base_price': product.get('cost', 0)
-            })
+            scored.append((
+                product_idx,
+                float(score),
+                float(semantic_scores[idx]),
+                float(fuzzy_scores[idx]),
+            ))
         
-        return matches
+        return tuple(scored)
 
     def match_best(self, query: str, threshold=0.5) -> Optional[Dict]:
         """Get best match for query with variation resolution
@@ -221,29 +415,30 @@ class FuzzyMenuMatcher:
         Returns:
             Best match dict with 'exists' and 'suggestions' flags, or None
         """
+        return self._match_best_canon(query, _canon(query), threshold)
+
+    def _match_best_canon(self, query: str, canon: str, threshold: float,
+                          query_embeddings: Optional[Dict[str, np.ndarray]] = None) -> Optional[Dict]:
+        """match_best() for a query whose canonical form is already known"""
         # NEW: Check if this is a known non-existent product FIRST
-        query_lower = query.lower().strip()
-        
-        # Import here to avoid circular imports
-        try:
-            from product_variations import UNKNOWN_PRODUCTS
-            
-            if query_lower in UNKNOWN_PRODUCTS:
-                # This product doesn't exist - return with suggestions
-                return {
-                    'product': None,
-                    'product_name': query,
-                    'product_id': None,
-                    'similarity': 0.0,
-                    'exists': False,
-                    'suggestions': UNKNOWN_PRODUCTS[query_lower],
-                    'original_query': query
-                }
-        except:
-            pass
+        if canon in self._unknown:
+            # This product doesn't exist - return with suggestions
+            return {
+                'product': None,
+                'product_name': query,
+                'product_id': None,
+                'similarity': 0.0,
+                'exists': False,
+                'suggestions': self._unknown[canon],
+                'original_query': query
+            }
         
         # Try normal matching
-        matches = self.match(query, top_k=1, threshold=threshold)
+        if not query:
+            return None
+        key = self._normalize_query(query, canon)
+        query_embedding = query_embeddings.get(key) if query_embeddings else None
+        matches = self._match_key(key, top_k=1, threshold=threshold, query_embedding=query_embedding)
         
         if matches:
             best_match = matches[0]
@@ -254,6 +449,41 @@ class FuzzyMenuMatcher:
             return best_match
         
         return None
+
+    def match_best_batch(self, queries: List[str], threshold=0.5) -> List[Optional[Dict]]:
+        """Get best matches for several queries with one model forward pass
+        
+        Args:
+            queries: Product names to match
+            threshold: Minimum similarity threshold
+            
+        Returns:
+            One match_best() result per query, in order
+        """
+        canons = [_canon(q) for q in queries]
+        # Local to this call so concurrent batches never see each other's vectors
+        query_embeddings: Dict[str, np.ndarray] = {}
+        
+        if self.embeddings is not None:
+            pending = list(dict.fromkeys(
+                self._normalize_query(q, canon)
+                for q, canon in zip(queries, canons)
+                if q and canon not in self._unknown
+            ))
+            if pending:
+                encoded = self.model.encode(
+                    pending,
+                    batch_size=len(pending),
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+                query_embeddings = dict(zip(pending, encoded))
+        
+        return [
+            self._match_best_canon(q, canon, threshold, query_embeddings)
+            for q, canon in zip(queries, canons)
+        ]
+
     def match_with_category(self, query: str, category_hint: Optional[str] = None) -> Optional[Dict]:
         """Optionally bias results to a category (e.g., 'rebel', 'mocha')."""
         matches = self.match(query, top_k=10, threshold=0.3)
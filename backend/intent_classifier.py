@@ -1,6 +1,17 @@
 # src/intent_classifier.py
 import re
-from typing import Dict, List
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Classification results kept per classifier (lowercased utterance -> result)
+CLASSIFY_CACHE_SIZE = 1024
+
+
+def _fuse(patterns: List[re.Pattern]) -> re.Pattern:
+    """Join compiled patterns into one alternation with a named group per pattern"""
+    return re.compile('|'.join(f'(?P<p{i}>{p.pattern})' for i, p in enumerate(patterns)))
+
 
 class IntentClassifier:
     """Classify customer utterance intent"""
@@ -21,6 +32,7 @@ class IntentClassifier:
             r"may i (get|have)",
             r"i need",
         ]
+        self.order_patterns = [re.compile(p) for p in self.order_patterns]
         
         # NEGATIVE patterns (indicate NOT ordering)
         self.negative_patterns = [
@@ -33,6 +45,7 @@ class IntentClassifier:
             r"never (get|have|buy)",
             r"refuse",
         ]
+        self.negative_patterns = [re.compile(p) for p in self.negative_patterns]
         
         # Question patterns
         self.question_patterns = [
@@ -46,13 +59,14 @@ class IntentClassifier:
             r"where",
             r"when",
         ]
+        self.question_patterns = [re.compile(p) for p in self.question_patterns]
         
         # Greeting/chitchat patterns
         self.chitchat_patterns = [
             r"^(hi|hello|hey|good morning|good afternoon)",
             r"how are you",
             r"how's it going",
-            r"thanks|thank you",
+            r"thank(s| you)",
             r"have a (good|great|nice) (day|morning|afternoon)",
             r"that('s| is) (it|all)",
             r"perfect",
@@ -60,6 +74,14 @@ class IntentClassifier:
             r"i am [a-z]+",  # "I am maanesh"
             r"my name is",
         ]
+        self.chitchat_patterns = [re.compile(p) for p in self.chitchat_patterns]
+        
+        # One alternation per category: a single scan finds most hits, and
+        # categories with no hit at all skip the per-pattern checks
+        self._negative_re = _fuse(self.negative_patterns)
+        self._order_re = _fuse(self.order_patterns)
+        self._question_re = _fuse(self.question_patterns)
+        self._chitchat_re = _fuse(self.chitchat_patterns)
         
         # Product/menu keywords (weaker signals now)
         self.product_keywords = [
@@ -69,6 +91,11 @@ class IntentClassifier:
             "rainbow", "rainbro", "soft top", "whip", "drizzle", "shot",
             "milk", "oat", "almond", "coconut", "boba", "size"
         ]
+        
+        # Live transcription re-sends the same segments (partials, retries);
+        # repeats of a lowercased utterance are served from here
+        self._classify_cache: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._classify_cache_lock = threading.Lock()
     
     def classify(self, text: str, verbose=False) -> Dict:
         """Classify intent of utterance
@@ -82,64 +109,84 @@ class IntentClassifier:
         """
         text_lower = text.lower()
         
-        # FIRST: Check for negative patterns (strong signal)
-        has_negative = False
-        for pattern in self.negative_patterns:
-            if re.search(pattern, text_lower):
-                has_negative = True
-                if verbose:
-                    print(f"   🚫 Found negative pattern: {pattern}")
-                break
+        if verbose:
+            # Debug output is printed while classifying, so never cached
+            result = self._classify_impl(text_lower, verbose=True)
+        else:
+            result = self._cached_result(text_lower) or self._classify_and_cache(text_lower)
         
-        # Check for order patterns
-        order_score = 0
-        matched_order_patterns = []
+        (intent, confidence, order_score, question_score, chitchat_score,
+         product_count, has_negative, matched_order_patterns,
+         matched_question_patterns, matched_chitchat_patterns) = result
         
-        for pattern in self.order_patterns:
-            if re.search(pattern, text_lower):
-                order_score += 3  # Strong signal
-                matched_order_patterns.append(pattern)
+        result = {
+            "intent": intent,
+            "confidence": confidence,
+            "scores": {
+                "ORDER": order_score,
+                "QUESTION": question_score,
+                "CHITCHAT": chitchat_score
+            },
+            "product_keywords_found": product_count,
+            "has_negative": has_negative
+        }
         
-        # Check for product keywords (but reduce weight)
-        product_count = 0
-        for keyword in self.product_keywords:
-            if keyword in text_lower:
-                # Only add to score if we have order patterns OR no negatives
-                if matched_order_patterns or not has_negative:
-                    order_score += 0.5  # Weaker signal than before
-                product_count += 1
+        if verbose:
+            result["matched_patterns"] = {
+                "order": list(matched_order_patterns),
+                "question": list(matched_question_patterns),
+                "chitchat": list(matched_chitchat_patterns)
+            }
         
-        # If negative pattern found, heavily penalize ORDER
-        if has_negative:
-            order_score = max(0, order_score - 10)
+        return result
+    
+    def _cached_result(self, text_lower: str) -> Optional[Tuple]:
+        """Cached _classify_impl() result for text_lower, if any"""
+        with self._classify_cache_lock:
+            result = self._classify_cache.get(text_lower)
+            if result is not None:
+                self._classify_cache.move_to_end(text_lower)
+            return result
+    
+    def _classify_and_cache(self, text_lower: str, order_stage: Optional[Tuple] = None) -> Tuple:
+        """_classify_impl() plus storing the result, evicting the oldest past the cap"""
+        result = self._classify_impl(text_lower, order_stage=order_stage)
+        with self._classify_cache_lock:
+            self._classify_cache[text_lower] = result
+            if len(self._classify_cache) > CLASSIFY_CACHE_SIZE:
+                self._classify_cache.popitem(last=False)
+        return result
+    
+    def _classify_impl(self, text_lower: str, verbose=False, order_stage: Optional[Tuple] = None) -> Tuple:
+        """Score an already lowercased utterance
         
-        # Check for question patterns
-        question_score = 0
-        matched_question_patterns = []
+        Args:
+            text_lower: Lowercased transcribed text
+            verbose: Print debug info
+            order_stage: _score_order() result when the caller already has it
+            
+        Returns:
+            Immutable tuple of intent, confidence, per-intent scores, keyword
+            count, negative flag and the matched patterns per category
+        """
+        if order_stage is None:
+            order_stage = self._score_order(text_lower, verbose)
+        has_negative, order_score, product_count, matched_order_patterns = order_stage
         
-        for pattern in self.question_patterns:
-            if re.search(pattern, text_lower):
-                question_score += 3  # Strong signal
-                matched_question_patterns.append(pattern)
+        # Check for question patterns
+        matched_question_patterns = self._matched_patterns(self._question_re, self.question_patterns, text_lower)
+        question_score = 3 * len(matched_question_patterns)  # Strong signal
         
         # Check for chitchat patterns
-        chitchat_score = 0
-        matched_chitchat_patterns = []
-        
-        for pattern in self.chitchat_patterns:
-            if re.search(pattern, text_lower):
-                chitchat_score += 2
-                matched_chitchat_patterns.append(pattern)
-        
-        # Determine intent
-        scores = {
-            "ORDER": order_score,
-            "QUESTION": question_score,
-            "CHITCHAT": chitchat_score
-        }
+        matched_chitchat_patterns = self._matched_patterns(self._chitchat_re, self.chitchat_patterns, text_lower)
+        chitchat_score = 2 * len(matched_chitchat_patterns)
         
-        intent = max(scores, key=scores.get)
-        max_score = scores[intent]
+        # Determine intent (ties go to the earlier of ORDER, QUESTION, CHITCHAT)
+        intent, max_score = "ORDER", order_score
+        if question_score > max_score:
+            intent, max_score = "QUESTION", question_score
+        if chitchat_score > max_score:
+            intent, max_score = "CHITCHAT", chitchat_score
         
         # If no strong signal, default to CHITCHAT (safer than ORDER)
         if max_score <= 0:
@@ -147,25 +194,59 @@ class IntentClassifier:
             max_score = 1
         
         # Calculate confidence (0-1)
-        total_score = sum(scores.values()) or 1
+        total_score = order_score + question_score + chitchat_score or 1
         confidence = max_score / total_score
         
-        result = {
-            "intent": intent,
-            "confidence": confidence,
-            "scores": scores,
-            "product_keywords_found": product_count,
-            "has_negative": has_negative
-        }
+        return (intent, confidence, order_score, question_score, chitchat_score,
+                product_count, has_negative, tuple(matched_order_patterns),
+                tuple(matched_question_patterns), tuple(matched_chitchat_patterns))
+    
+    def _score_order(self, text_lower: str, verbose=False) -> Tuple:
+        """Negative check plus ORDER scoring, the first stage of classify
         
-        if verbose:
-            result["matched_patterns"] = {
-                "order": matched_order_patterns,
-                "question": matched_question_patterns,
-                "chitchat": matched_chitchat_patterns
-            }
+        Args:
+            text_lower: Lowercased transcribed text
+            verbose: Print debug info
+            
+        Returns:
+            Tuple of negative flag, ORDER score, keyword count and matched
+            order patterns
+        """
+        # FIRST: Check for negative patterns (strong signal)
+        has_negative = self._negative_re.search(text_lower) is not None
+        if has_negative and verbose:
+            for pattern in self.negative_patterns:
+                if pattern.search(text_lower):
+                    print(f"   🚫 Found negative pattern: {pattern.pattern}")
+                    break
         
-        return result
+        # Check for order patterns
+        matched_order_patterns = self._matched_patterns(self._order_re, self.order_patterns, text_lower)
+        order_score = 3 * len(matched_order_patterns)  # Strong signal
+        
+        # Check for product keywords (but reduce weight)
+        product_count = sum(1 for keyword in self.product_keywords if keyword in text_lower)
+        # Only add to score if we have order patterns OR no negatives
+        if product_count and (matched_order_patterns or not has_negative):
+            order_score += 0.5 * product_count  # Weaker signal than before
+        
+        # If negative pattern found, heavily penalize ORDER
+        if has_negative:
+            order_score = max(0, order_score - 10)
+        
+        return has_negative, order_score, product_count, matched_order_patterns
+    
+    def _matched_patterns(self, fused: re.Pattern, patterns: List[re.Pattern], text: str) -> List[str]:
+        """Source strings of the patterns that match text, in list order
+        
+        One scan of the fused alternation finds the hits; alternatives it
+        skipped over (e.g. "do you have" inside "what do you have") are
+        re-checked individually only if the category matched at all.
+        """
+        found = {int(m.lastgroup[1:]) for m in fused.finditer(text)}
+        if not found:
+            return []
+        return [p.pattern for i, p in enumerate(patterns) if i in found or p.search(text)]
     
     def is_order(self, text: str, threshold=0.5) -> bool:
         """Check if text is an order
@@ -177,8 +258,19 @@ class IntentClassifier:
         Returns:
             True if classified as ORDER with confidence > threshold
         """
-        result = self.classify(text)
-        return result["intent"] == "ORDER" and result["confidence"] >= threshold
+        text_lower = text.lower()
+        result = self._cached_result(text_lower)
+        if result is None:
+            # ORDER can only win with a positive score, so most non-orders are
+            # rejected before the question/chitchat patterns are scanned; the
+            # ORDER stage is reused for the rest of the classification
+            order_stage = self._score_order(text_lower)
+            if order_stage[1] <= 0:
+                return False
+            result = self._classify_and_cache(text_lower, order_stage)
+        
+        intent, confidence = result[0], result[1]
+        return intent == "ORDER" and confidence >= threshold
 
 
 def demo_classifier():
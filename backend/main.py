@@ -1,18 +1,39 @@
 import os
+import sys
+import queue
+import logging
+import logging.handlers
 import boto3
 import uvicorn
 import asyncio
 import httpx
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
-from datetime import datetime, time
-import uuid
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional, Set
+from datetime import date, datetime, time
+import secrets
+from collections import OrderedDict
 from dotenv import load_dotenv
 import json
 import api_pipeline as api
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def json_text(data) -> str:
+    """Compact JSON text, same format as Starlette's send_json (orjson when available)"""
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+# Parses bytes directly; both raise a ValueError subclass on bad input
+json_loads = orjson.loads if orjson is not None else json.loads
+
 # Import the AWS Transcribe Streaming SDK
 from amazon_transcribe.client import TranscribeStreamingClient
 from amazon_transcribe.handlers import TranscriptResultStreamHandler
@@ -41,6 +62,16 @@ if not DUTCH_BROS_API_KEY:
     print("WARNING: Missing DUTCH_BROS_API_KEY in .env file.")
     print("--------------------------------------------------")
 
+# Order submission logs go through a queue; a background thread writes them,
+# so a slow stdout never blocks the event loop. LOG_LEVEL=debug adds request bodies.
+order_logger = logging.getLogger("orders")
+order_logger.setLevel(getattr(logging, os.getenv("LOG_LEVEL", "info").upper(), logging.INFO))
+order_logger.propagate = False
+_order_log_queue = queue.SimpleQueue()
+order_logger.addHandler(logging.handlers.QueueHandler(_order_log_queue))
+_order_log_listener = logging.handlers.QueueListener(_order_log_queue, logging.StreamHandler(sys.stdout))
+_order_log_listener.start()
+
 # --- FastAPI App ---
 app = FastAPI()
 
@@ -60,7 +91,23 @@ app.add_middleware(
 # --- Global State ---
 notification_service = NotificationService()
 simulated_time: Optional[datetime] = None
-active_notification_websockets: List[WebSocket] = []
+active_notification_websockets: Set[WebSocket] = set()
+
+# Shared POS API client: keeps connections (and TLS sessions) alive across orders
+pos_api_client = httpx.AsyncClient(
+    timeout=30.0,
+    limits=httpx.Limits(max_keepalive_connections=20)
+)
+
+@app.on_event("shutdown")
+async def close_pos_api_client():
+    """Close pooled POS API connections on server shutdown"""
+    await pos_api_client.aclose()
+
+@app.on_event("shutdown")
+def stop_order_log_listener():
+    """Flush queued order logs on server shutdown"""
+    _order_log_listener.stop()
 
 # --- Models ---
 class OrderItem(BaseModel):
@@ -84,7 +131,7 @@ class OrderResponse(BaseModel):
     timestamp: str
 
 class SetTimeRequest(BaseModel):
-    time: str  # Format: "HH:MM"
+    time: str = Field(pattern=r"^([01]\d|2[0-3]):[0-5]\d$")  # Format: "HH:MM"
 
 # --- Helper Functions ---
 def get_current_time() -> datetime:
@@ -98,120 +145,106 @@ async def broadcast_notification(notification: Notification):
     notification_data = notification.to_dict()
     print(f"📢 Broadcasting notification: {notification.title}")
     
-    disconnected = []
-    for ws in active_notification_websockets:
-        try:
-            await ws.send_json(notification_data)
-        except Exception as e:
-            print(f"Failed to send to client: {e}")
-            disconnected.append(ws)
+    # Encode once (same format as send_json) and fan out concurrently so a
+    # slow client doesn't hold up the others. Snapshot the clients: they
+    # can connect or drop while the sends are awaited.
+    payload = json_text(notification_data)
+    clients = list(active_notification_websockets)
+    results = await asyncio.gather(
+        *(ws.send_text(payload) for ws in clients), return_exceptions=True
+    )
+    
+    disconnected = set()
+    for ws, result in zip(clients, results):
+        if isinstance(result, Exception):
+            print(f"Failed to send to client: {result}")
+            disconnected.add(ws)
     
     # Remove disconnected clients
-    for ws in disconnected:
-        active_notification_websockets.remove(ws)
+    active_notification_websockets.difference_update(disconnected)
+
+# Scheduled notification for each hour of the day (None = nothing scheduled)
+_MORNING_RUSH_APPROACHING = dict(
+    type=NotificationType.PEAK_APPROACHING,
+    priority=NotificationPriority.HIGH,
+    title="⚠️ Morning Rush Approaching",
+    message="Peak hours (7:00-10:00 AM) begin soon. Prepare stations!",
+    action="prep_rush"
+)
+_MORNING_PEAK_ACTIVE = dict(
+    type=NotificationType.PEAK_ACTIVE,
+    priority=NotificationPriority.MEDIUM,
+    title="🔥 Morning Peak Active",
+    message="Currently in morning peak (7:00-10:00 AM). High volume expected."
+)
+_LUNCH_RUSH_APPROACHING = dict(
+    type=NotificationType.PEAK_APPROACHING,
+    priority=NotificationPriority.HIGH,
+    title="⚠️ Lunch Rush Approaching",
+    message="Lunch peak (12:00-2:00 PM) begins soon. Restock popular items!",
+    action="prep_rush"
+)
+_CLEANING_TIME = dict(
+    type=NotificationType.CLEANING_TIME,
+    priority=NotificationPriority.LOW,
+    title="🧹 Slow Period - Cleaning Time",
+    message="Low traffic period. Good time for cleaning and restocking.",
+    action="start_cleaning"
+)
+_EVENING_RESTOCK = dict(
+    type=NotificationType.RESTOCK,
+    priority=NotificationPriority.MEDIUM,
+    title="📦 Restock Before Evening Rush",
+    message="Evening peak (7:00-10:00 PM) approaching. Restock popular items!",
+    action="restock"
+)
+_EVENING_RUSH_ACTIVE = dict(
+    type=NotificationType.EVENING_RUSH,
+    priority=NotificationPriority.HIGH,
+    title="🌙 Evening Rush Active",
+    message="Peak evening hours (7:00-10:00 PM). Expect high volume.",
+    action="evening_prep"
+)
+_CLOSING_TIME = dict(
+    type=NotificationType.CLOSING_TIME,
+    priority=NotificationPriority.HIGH,
+    title="🔒 Closing Time",
+    message="Begin closing procedures. Clean equipment and prep for tomorrow.",
+    action="start_closing"
+)
+
+HOUR_DISPATCH = tuple(
+    {
+        6: _MORNING_RUSH_APPROACHING,   # Morning rush approaching (6 AM)
+        7: _MORNING_PEAK_ACTIVE,        # Morning peak active (7-10 AM)
+        8: _MORNING_PEAK_ACTIVE,
+        9: _MORNING_PEAK_ACTIVE,
+        11: _LUNCH_RUSH_APPROACHING,    # Lunch rush approaching (11 AM)
+        14: _CLEANING_TIME,             # Afternoon slow period (2-4 PM)
+        15: _CLEANING_TIME,
+        17: _EVENING_RESTOCK,           # Evening rush prep (5 PM)
+        19: _EVENING_RUSH_ACTIVE,       # Evening rush active (7-10 PM)
+        20: _EVENING_RUSH_ACTIVE,
+        21: _EVENING_RUSH_ACTIVE,
+        22: _CLOSING_TIME,              # Closing time (10 PM)
+    }.get(hour)
+    for hour in range(24)
+)
 
 def check_and_generate_notifications(current_time: datetime):
     """Check time and generate appropriate notifications"""
-    hour = current_time.hour
+    spec = HOUR_DISPATCH[current_time.hour]
+    if spec is None:
+        return None
     
-    # Morning rush approaching (6 AM)
-    if hour == 6:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.PEAK_APPROACHING,
-            priority=NotificationPriority.HIGH,
-            title="⚠️ Morning Rush Approaching",
-            message="Peak hours (7:00-10:00 AM) begin soon. Prepare stations!",
-            timestamp=current_time,
-            action="prep_rush"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Morning peak active (7-10 AM)
-    elif hour >= 7 and hour < 10:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.PEAK_ACTIVE,
-            priority=NotificationPriority.MEDIUM,
-            title="🔥 Morning Peak Active",
-            message=f"Currently in morning peak (7:00-10:00 AM). High volume expected.",
-            timestamp=current_time
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Lunch rush approaching (11 AM)
-    elif hour == 11:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.PEAK_APPROACHING,
-            priority=NotificationPriority.HIGH,
-            title="⚠️ Lunch Rush Approaching",
-            message="Lunch peak (12:00-2:00 PM) begins soon. Restock popular items!",
-            timestamp=current_time,
-            action="prep_rush"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Afternoon slow period (2-4 PM)
-    elif hour >= 14 and hour < 16:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.CLEANING_TIME,
-            priority=NotificationPriority.LOW,
-            title="🧹 Slow Period - Cleaning Time",
-            message="Low traffic period. Good time for cleaning and restocking.",
-            timestamp=current_time,
-            action="start_cleaning"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Evening rush prep (5 PM)
-    elif hour == 17:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.RESTOCK,
-            priority=NotificationPriority.MEDIUM,
-            title="📦 Restock Before Evening Rush",
-            message="Evening peak (7:00-10:00 PM) approaching. Restock popular items!",
-            timestamp=current_time,
-            action="restock"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Evening rush active (7-10 PM)
-    elif hour >= 19 and hour < 22:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.EVENING_RUSH,
-            priority=NotificationPriority.HIGH,
-            title="🌙 Evening Rush Active",
-            message="Peak evening hours (7:00-10:00 PM). Expect high volume.",
-            timestamp=current_time,
-            action="evening_prep"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    # Closing time (10 PM)
-    elif hour == 22:
-        notif = Notification(
-            notification_id=notification_service.generate_notification_id(),
-            type=NotificationType.CLOSING_TIME,
-            priority=NotificationPriority.HIGH,
-            title="🔒 Closing Time",
-            message="Begin closing procedures. Clean equipment and prep for tomorrow.",
-            timestamp=current_time,
-            action="start_closing"
-        )
-        notification_service.add_notification(notif)
-        return notif
-    
-    return None
+    notif = Notification(
+        notification_id=notification_service.generate_notification_id(),
+        timestamp=current_time,
+        **spec
+    )
+    if not notification_service.add_notification(notif):
+        return None
+    return notif
 
 # --- Time API Endpoints ---
 @app.post("/api/time/set")
@@ -219,30 +252,24 @@ async def set_time(request: SetTimeRequest):
     """Set simulated time"""
     global simulated_time
     
-    try:
-        # Parse time string (HH:MM)
-        time_parts = request.time.split(":")
-        hour = int(time_parts[0])
-        minute = int(time_parts[1])
-        
-        # Create datetime with today's date but specified time
-        now = datetime.now()
-        simulated_time = datetime(now.year, now.month, now.day, hour, minute)
-        
-        print(f"⏰ Time set to: {simulated_time.strftime('%H:%M')}")
-        
-        # Check if we should generate notifications for this time
-        notification = check_and_generate_notifications(simulated_time)
-        if notification:
-            await broadcast_notification(notification)
-        
-        return {
-            "status": "success",
-            "time": simulated_time.strftime("%H:%M"),
-            "message": f"Time set to {request.time}"
-        }
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid time format: {str(e)}")
+    # Parse time string (HH:MM); malformed input is rejected by the model
+    hour, minute = map(int, request.time.split(":", 1))
+    
+    # Create datetime with today's date but specified time
+    simulated_time = datetime.combine(date.today(), time(hour, minute))
+    
+    print(f"⏰ Time set to: {simulated_time.strftime('%H:%M')}")
+    
+    # Check if we should generate notifications for this time
+    notification = check_and_generate_notifications(simulated_time)
+    if notification:
+        await broadcast_notification(notification)
+    
+    return {
+        "status": "success",
+        "time": simulated_time.strftime("%H:%M"),
+        "message": f"Time set to {request.time}"
+    }
 
 @app.post("/api/time/reset")
 async def reset_time():
@@ -272,7 +299,7 @@ async def get_current_time_api():
 async def websocket_notifications(websocket: WebSocket):
     """WebSocket endpoint for real-time notifications"""
     await websocket.accept()
-    active_notification_websockets.append(websocket)
+    active_notification_websockets.add(websocket)
     
     print(f"🔌 Notification client connected. Total clients: {len(active_notification_websockets)}")
     
@@ -291,14 +318,17 @@ async def websocket_notifications(websocket: WebSocket):
                 if notification_id:
                     notification_service.dismiss_notification(notification_id)
                     print(f"❌ Dismissed notification: {notification_id}")
+                notification_ids = data.get("notification_ids")
+                if notification_ids:
+                    notification_service.dismiss_notifications(notification_ids)
+                    print(f"❌ Dismissed {len(notification_ids)} notifications")
     
     except WebSocketDisconnect:
         print(f"🔌 Notification client disconnected")
     except Exception as e:
         print(f"Notification WebSocket error: {e}")
     finally:
-        if websocket in active_notification_websockets:
-            active_notification_websockets.remove(websocket)
+        active_notification_websockets.discard(websocket)
         print(f"🔌 Total clients: {len(active_notification_websockets)}")
 
 # --- Order Endpoint ---
@@ -306,20 +336,17 @@ async def websocket_notifications(websocket: WebSocket):
 async def submit_order(order: SubmitOrderRequest):
     """Submit a new order to the Dutch Bros POS system"""
     try:
-        order_items = []
-        for item in order.items:
-            modifiers = {}
-            for mod in item.child_items:
-                modifiers[mod['modifier_group']] = mod['name']
-            
-            # Build the item - do NOT include 'size' as a top-level field
-            # when using the legacy modifiers format (size goes in modifiers object)
-            order_items.append({
+        # Build the items - do NOT include 'size' as a top-level field
+        # when using the legacy modifiers format (size goes in modifiers object)
+        order_items = [
+            {
                 "name": item.name,
                 "category": item.category,
                 "quantity": item.quantity,
-                "modifiers": modifiers
-            })
+                "modifiers": {mod['modifier_group']: mod['name'] for mod in item.child_items}
+            }
+            for item in order.items
+        ]
         
         api_payload = {
             "source": "online",
@@ -330,38 +357,41 @@ async def submit_order(order: SubmitOrderRequest):
         if order.notes:
             api_payload["notes"] = order.notes
         
-        print(f"\n{'='*60}")
-        print(f"SUBMITTING ORDER TO DUTCH BROS API")
-        print(f"{'='*60}")
-        print(f"Customer: {order.customer_name}")
-        print(f"Items: {len(order.items)}")
+        order_logger.info("SUBMITTING ORDER TO DUTCH BROS API - Customer: %s, Items: %d",
+                          order.customer_name, len(order.items))
         
-        import json
-        print(f"\nRequest Body:")
-        print(json.dumps(api_payload, indent=2))
+        # Encode the body once here and send those bytes as-is below
+        body = orjson.dumps(api_payload) if orjson is not None else json.dumps(api_payload).encode()
+        
+        # The indented dump is only built when debug logging is on
+        if order_logger.isEnabledFor(logging.DEBUG):
+            if orjson is not None:
+                pretty_body = orjson.dumps(api_payload, option=orjson.OPT_INDENT_2).decode()
+            else:
+                pretty_body = json.dumps(api_payload, indent=2)
+            order_logger.debug("Request Body:\n%s", pretty_body)
         
         headers = {
             "Content-Type": "application/json",
             "x-api-key": DUTCH_BROS_API_KEY,
-            "Idempotency-Key": str(uuid.uuid4())
+            "Idempotency-Key": secrets.token_hex(16)
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                f"{DUTCH_BROS_API_BASE_URL}/orders",
-                json=api_payload,
-                headers=headers
-            )
+        response = await pos_api_client.post(
+            f"{DUTCH_BROS_API_BASE_URL}/orders",
+            content=body,
+            headers=headers
+        )
         
         if response.status_code == 202:
-            result = response.json()
+            result = json_loads(response.content)
             order_data = result.get('data', {})
-            order_id = order_data.get('order_id', f"ORD-{uuid.uuid4().hex[:8].upper()}")
+            # Fallback ID only generated when the API didn't return one
+            order_id = order_data['order_id'] if 'order_id' in order_data else f"ORD-{secrets.token_hex(4).upper()}"
             
-            print(f"✓ Order submitted successfully: {order_id}")
+            order_logger.info("✓ Order submitted successfully: %s", order_id)
             if 'kds_url' in order_data:
-                print(f"✓ KDS URL: {order_data['kds_url']}")
-            print(f"{'='*60}\n")
+                order_logger.info("✓ KDS URL: %s", order_data['kds_url'])
             
             return OrderResponse(
                 status="success",
@@ -370,25 +400,33 @@ async def submit_order(order: SubmitOrderRequest):
                 timestamp=datetime.now().isoformat()
             )
         else:
-            error_detail = response.json() if response.text else {"error": "Unknown error"}
-            error_message = error_detail.get('error', {}).get('message', response.text)
-            print(f"✗ API Error ({response.status_code}): {error_message}")
-            print(f"{'='*60}\n")
+            # Parse the body once; non-JSON or unexpected shapes fall back to the raw text
+            try:
+                error_detail = json_loads(response.content) if response.content else {}
+            except ValueError:
+                error_detail = {}
+            error = error_detail.get('error') if isinstance(error_detail, dict) else None
+            if isinstance(error, dict) and 'message' in error:
+                error_message = error['message']
+            else:
+                error_message = response.text or "Unknown error"
+            order_logger.warning("✗ API Error (%s): %s", response.status_code, error_message)
             raise HTTPException(
                 status_code=response.status_code,
                 detail=f"Dutch Bros API error: {error_message}"
             )
         
     except httpx.RequestError as e:
-        print(f"✗ Network error: {e}")
-        print(f"{'='*60}\n")
+        order_logger.error("✗ Network error: %s", e)
         raise HTTPException(
             status_code=503,
             detail=f"Failed to connect to Dutch Bros API: {str(e)}"
         )
+    except HTTPException:
+        # Upstream errors keep the status the POS returned
+        raise
     except Exception as e:
-        print(f"✗ Error: {e}")
-        print(f"{'='*60}\n")
+        order_logger.error("✗ Error: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to process order: {str(e)}")
 
 
@@ -398,26 +436,23 @@ async def assemble_transcript(transcript_queue: asyncio.Queue):
     """
     Continuously collects final transcript segments and merges them into one text.
     """
-    full_transcript = ""
+    segments: List[str] = []
     while True:
         text_chunk = await transcript_queue.get()
         if text_chunk is None:
             break  # End signal
-        full_transcript += " " + text_chunk
-    return full_transcript.strip()
+        segments.append(text_chunk)
+    return " ".join(segments).strip()
 
 
-async def audio_stream_generator(audio_queue: asyncio.Queue):
-    """Pulls audio chunks from the queue and yields them to the AWS stream"""
-    while True:
-        try:
-            chunk = await audio_queue.get()
-            if chunk is None:
-                break
-            yield chunk
-        except Exception as e:
-            print(f"Error in audio stream generator: {e}")
-            break
+# 200 ms of 16 kHz mono 16-bit PCM per AWS audio event. Audio arrives in
+# real time, so a frame never waits more than ~200 ms to fill.
+AUDIO_FRAME_BYTES = 6400
+
+# Client packets buffered ahead of AWS (~1 s of 20 ms chunks). When AWS falls
+# behind, the oldest audio is dropped instead of growing without bound.
+AUDIO_QUEUE_MAXSIZE = 50
+AUDIO_QUEUE_PUT_TIMEOUT = 0.1
 
 
 class MyTranscriptHandler(TranscriptResultStreamHandler):
@@ -439,30 +474,31 @@ class MyTranscriptHandler(TranscriptResultStreamHandler):
 
                     if not result.is_partial:
                         await self.transcript_queue.put(transcript_text)
-                        await self.client_websocket.send_json(
-                            {"status": "FINAL_SEGMENT", "transcript": transcript_text}
+                        await self.client_websocket.send_text(
+                            json_text({"status": "FINAL_SEGMENT", "transcript": transcript_text})
                         )
                     else:
-                        await self.client_websocket.send_json(
-                            {"status": "PARTIAL_SEGMENT", "transcript": transcript_text}
+                        await self.client_websocket.send_text(
+                            json_text({"status": "PARTIAL_SEGMENT", "transcript": transcript_text})
                         )
 
 
-from fastapi import WebSocket
-from typing import Dict
-import uuid
-
 # Store active WebSocket sessions
 latest_transcription_result=None
+# Per-session results, read once via ?session_id=; oldest unread ones are evicted
+transcription_results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+MAX_STORED_TRANSCRIPTION_RESULTS = 100
 @app.websocket("/ws/transcribe-live")
 async def websocket_transcribe_live(websocket: WebSocket):
     """Handles a live audio stream from the client for transcription"""
     await websocket.accept()
     
+    session_id = secrets.token_hex(16)
+    await websocket.send_json({"status": "SESSION", "session_id": session_id})
 
-    print(f"INFO: transcription connection open")
+    print(f"INFO: transcription connection open (session {session_id})")
 
-    audio_queue = asyncio.Queue()
+    audio_queue = asyncio.Queue(maxsize=AUDIO_QUEUE_MAXSIZE)
     transcript_queue = asyncio.Queue()
     transcribe_client = TranscribeStreamingClient(region=AWS_REGION)
 
@@ -474,34 +510,60 @@ async def websocket_transcribe_live(websocket: WebSocket):
 
     handler = MyTranscriptHandler(stream.output_stream, websocket, transcript_queue)
 
+    async def enqueue_audio(item):
+        """Put on the bounded audio queue, dropping the oldest packet if AWS stalls"""
+        try:
+            await asyncio.wait_for(audio_queue.put(item), timeout=AUDIO_QUEUE_PUT_TIMEOUT)
+        except asyncio.TimeoutError:
+            while True:
+                try:
+                    audio_queue.put_nowait(item)
+                    return
+                except asyncio.QueueFull:
+                    audio_queue.get_nowait()
+
     async def read_from_client():
         while True:
             try:
                 data = await websocket.receive_bytes()
-                await audio_queue.put(data)
+                await enqueue_audio(data)
             except WebSocketDisconnect:
                 print(f"Session  Client disconnected.")
-                await audio_queue.put(None)
+                await enqueue_audio(None)
                 break
             except Exception as e:
                 print(f"Session    Error reading from client: {e}")
-                await audio_queue.put(None)
+                await enqueue_audio(None)
                 break
 
     async def write_to_aws(aws_stream, audio_queue: asyncio.Queue):
             """
             Task 2: Takes audio from the queue and sends it to AWS.
             """
-            # Use the generator you already wrote!
-            stream_generator = audio_stream_generator(audio_queue)
+            buffer = bytearray()
             try:
-                async for chunk in stream_generator:
-                    # Send the audio chunk to AWS
-                    await aws_stream.input_stream.send_audio_event(audio_chunk=chunk)
+                done = False
+                while not done:
+                    chunk = await audio_queue.get()
+                    # Take everything already queued in the same loop turn
+                    while chunk is not None:
+                        # Coalesce client packets into fixed-size frames for AWS
+                        buffer += chunk
+                        try:
+                            chunk = audio_queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            break
+                    done = chunk is None
+                    while len(buffer) >= AUDIO_FRAME_BYTES:
+                        await aws_stream.input_stream.send_audio_event(audio_chunk=bytes(buffer[:AUDIO_FRAME_BYTES]))
+                        del buffer[:AUDIO_FRAME_BYTES]
+                # Flush whatever is left once the client stops sending
+                if buffer:
+                    await aws_stream.input_stream.send_audio_event(audio_chunk=bytes(buffer))
             except Exception as e:
                 print(f"Error writing to AWS stream: {e}")
             finally:
-                # Once the generator is done, tell AWS we are done sending audio
+                # Once the client is done, tell AWS we are done sending audio
                 await aws_stream.input_stream.end_stream()
                 print("AWS audio stream ended.")
     try:    
@@ -512,8 +574,20 @@ async def websocket_transcribe_live(websocket: WebSocket):
         client_reader_task = asyncio.create_task(read_from_client())
         aws_writer_task = asyncio.create_task(write_to_aws(stream, audio_queue))
 
-        # Wait for all three tasks to complete
-        await asyncio.gather(client_reader_task, aws_handler_task, aws_writer_task)
+        # The AWS result stream is the last leg to finish in a normal session.
+        # Wait until it ends, surfacing failures as they happen, then stop
+        # whatever is still running (e.g. a reader on a client that never
+        # hung up after AWS closed the stream).
+        pending = {client_reader_task, aws_handler_task, aws_writer_task}
+        try:
+            while aws_handler_task in pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
         await transcript_queue.put(None)
         final_text = await aggregator_task
         pipe=api.APIPipeline()
@@ -524,6 +598,9 @@ async def websocket_transcribe_live(websocket: WebSocket):
             "type": "order_recognized",
             "data": result
         }
+        transcription_results[session_id] = latest_transcription_result
+        if len(transcription_results) > MAX_STORED_TRANSCRIPTION_RESULTS:
+            transcription_results.popitem(last=False)
     except WebSocketDisconnect:
         print("WebSocket disconnected.")
     except Exception as e:
@@ -554,11 +631,22 @@ async def store_transcription_result(result: dict):
     return {"message": "Result stored"}
 
 @app.get("/api/get-transcription-result")
-async def get_transcription_result():
-    """Frontend calls this to get the latest transcription result"""
+async def get_transcription_result(session_id: Optional[str] = None):
+    """Frontend calls this to get the latest transcription result
+    
+    With a session_id (sent on the live websocket as a SESSION message) the
+    result of that session is returned once and then discarded, so
+    concurrent sessions can't read each other's orders.
+    """
     
     global latest_transcription_result
     
+    if session_id is not None:
+        result = transcription_results.pop(session_id, None)
+        if result is None:
+            return {"status": "NO_DATA", "message": "No transcription result available"}
+        return result
+    
     if latest_transcription_result is None:
         return {"status": "NO_DATA", "message": "No transcription result available"}
     
@@ -572,4 +660,6 @@ if __name__ == "__main__":
     print(f"Using AWS Region: {AWS_REGION}")
     print("📢 Notification service initialized")
     print("⏰ Time simulation ready")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # PCM audio barely compresses and transcript messages are tiny, so
+    # permessage-deflate only costs CPU on every websocket frame
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=False)
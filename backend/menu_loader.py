@@ -1,8 +1,21 @@
 # src/menu_loader.py
+import functools
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+def _read_json(path: str):
+    """Read and parse a JSON file"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
 
 
 class MenuLoader:
@@ -21,31 +34,42 @@ class MenuLoader:
         self.products = []
         self.categories = []
         self.modifier_chains = []
+        self._lower_names = []
         
         self._load_data()
     
     def _load_data(self):
-        """Load menu and modifier data"""
+        """Load menu and modifier data
+        
+        Both files are read and parsed concurrently; errors surface below
+        exactly as they would from a sequential read.
+        """
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            menu_future = pool.submit(_read_json, self.menu_path)
+            modifiers_future = pool.submit(_read_json, self.modifiers_path)
+        
         # Load menu
         try:
             print(os.getcwd())
-            with open(self.menu_path, 'r') as f:
-                menu_data = json.load(f)
-                
-                self.categories = menu_data.get('categories', [])
-                
-                # Extract products from categories
-                self.products = []
-                for category in self.categories:
-                    # Get products from this category
-                    category_products = category.get('products', [])
-                    self.products.extend(category_products)
-                
-                print(f"✅ Loaded menu data: {len(self.categories)} categories, {len(self.products)} products")
-                
-                if len(self.products) == 0:
-                    print("⚠️ WARNING: No products found in categories!")
-                
+            menu_data = menu_future.result()
+            
+            self.categories = menu_data.get('categories', [])
+            
+            # Extract products from categories
+            self.products = []
+            for category in self.categories:
+                # Get products from this category
+                category_products = category.get('products', [])
+                self.products.extend(category_products)
+            
+            # Lowercased names for search, computed once instead of per query
+            self._lower_names = [(product, product.get('name', '').lower()) for product in self.products]
+            
+            print(f"✅ Loaded menu data: {len(self.categories)} categories, {len(self.products)} products")
+            
+            if len(self.products) == 0:
+                print("⚠️ WARNING: No products found in categories!")
+            
         except FileNotFoundError:
             print(f"❌ Error: {self.menu_path} not found")
             print("💡 Run 'python src/download_data.py' first to download menu data")
@@ -56,22 +80,21 @@ class MenuLoader:
         
         # Load modifiers
         try:
-            with open(self.modifiers_path, 'r') as f:
-                modifier_data = json.load(f)
-                
-                # Handle different structures
-                if isinstance(modifier_data, list):
-                    self.modifier_chains = modifier_data
-                elif isinstance(modifier_data, dict):
-                    if 'chains' in modifier_data:
-                        self.modifier_chains = modifier_data['chains']
-                    elif 'modifiers' in modifier_data:
-                        self.modifier_chains = modifier_data['modifiers']
-                    else:
-                        for value in modifier_data.values():
-                            if isinstance(value, list):
-                                self.modifier_chains = value
-                                break
+            modifier_data = modifiers_future.result()
+            
+            # Handle different structures
+            if isinstance(modifier_data, list):
+                self.modifier_chains = modifier_data
+            elif isinstance(modifier_data, dict):
+                if 'chains' in modifier_data:
+                    self.modifier_chains = modifier_data['chains']
+                elif 'modifiers' in modifier_data:
+                    self.modifier_chains = modifier_data['modifiers']
+                else:
+                    for value in modifier_data.values():
+                        if isinstance(value, list):
+                            self.modifier_chains = value
+                            break
             
             print(f"✅ Loaded modifiers: {len(self.modifier_chains)} chains")
         except FileNotFoundError:
@@ -80,6 +103,14 @@ class MenuLoader:
         except Exception as e:
             print(f"⚠️ Warning loading modifiers: {e}")
             self.modifier_chains = []
+        
+        # ID lookup tables; setdefault keeps the first entry like the old scans did
+        self._product_by_id = {}
+        for product in self.products:
+            self._product_by_id.setdefault(str(product.get('chainproductid')), product)
+        self._modifier_chain_by_id = {}
+        for chain in self.modifier_chains:
+            self._modifier_chain_by_id.setdefault(str(chain.get('chainproductid')), chain)
     
     def get_all_products(self) -> List[Dict]:
         """Get all products"""
@@ -92,21 +123,11 @@ class MenuLoader:
     def search_product_by_name(self, name: str) -> List[Dict]:
         """Search products by name"""
         name_lower = name.lower()
-        results = []
-        
-        for product in self.products:
-            product_name = product.get('name', '').lower()
-            if name_lower in product_name:
-                results.append(product)
-        
-        return results
+        return [product for product, product_name in self._lower_names if name_lower in product_name]
     
     def get_modifiers_for_product(self, product_id: str) -> Dict:
         """Get modifier chain for a product"""
-        for chain in self.modifier_chains:
-            if str(chain.get('chainproductid')) == str(product_id):
-                return chain
-        return {}
+        return self._modifier_chain_by_id.get(str(product_id), {})
     
     def get_image_url(self, product: Dict) -> str:
         """Get product image URL"""
@@ -124,10 +145,25 @@ class MenuLoader:
         Returns:
             Product dict or None
         """
-        for product in self.products:
-            if str(product.get('chainproductid')) == str(product_id):
-                return product
-        return None
+        return self._product_by_id.get(str(product_id))
+
+
+@functools.lru_cache(maxsize=None)
+def get_menu(menu_path='spark/backend/data/menu/menu.json',
+             modifiers_path='spark/backend/data/menu/modifiers.json') -> MenuLoader:
+    """Shared, read-only MenuLoader for the given files
+    
+    The menu is parsed once per process and the same instance is returned
+    on every later call with the same paths.
+    
+    Args:
+        menu_path: Path to menu JSON file
+        modifiers_path: Path to modifiers JSON file
+        
+    Returns:
+        MenuLoader instance
+    """
+    return MenuLoader(menu_path, modifiers_path)
 
 
 def demo_menu_loader():
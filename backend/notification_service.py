@@ -1,8 +1,18 @@
 from datetime import datetime
-from typing import List, Dict, Optional
+import json
+from typing import Iterable, List, Dict, Optional
 from enum import Enum
+from collections import OrderedDict, deque
 import asyncio
 
+# Identical notifications (same type, title, message and data) within this
+# many seconds of each other are dropped
+DEDUP_WINDOW_SECONDS = 60
+
+def _data_signature(data: Dict) -> str:
+    """Hashable, order-independent form of a notification's data payload"""
+    return json.dumps(data, sort_keys=True, default=str)
+
 class NotificationType(Enum):
     """Types of notifications"""
     PEAK_APPROACHING = "peak_approaching"
@@ -29,6 +39,12 @@ class NotificationPriority(Enum):
 
 class Notification:
     """Notification object"""
+    # Fixed attribute set: no per-instance __dict__ for the active list and history
+    __slots__ = (
+        "id", "type", "priority", "title", "message", "timestamp",
+        "action", "data", "dismissed", "_cached_dict",
+    )
+    
     def __init__(
         self,
         notification_id: str,
@@ -49,10 +65,23 @@ class Notification:
         self.action = action
         self.data = data or {}
         self.dismissed = False
+        # Serialized form, built on first to_dict() and reused until dismissed
+        self._cached_dict: Optional[Dict] = None
+    
+    def dismiss(self):
+        """Mark as dismissed and drop the cached serialized form"""
+        self.dismissed = True
+        self._cached_dict = None
     
     def to_dict(self) -> Dict:
-        """Convert to dictionary for JSON serialization"""
-        return {
+        """Convert to dictionary for JSON serialization
+        
+        Notifications don't change after construction apart from dismiss(),
+        so the dict is built once; callers must treat it as read-only.
+        """
+        if self._cached_dict is not None:
+            return self._cached_dict
+        self._cached_dict = {
             "id": self.id,
             "type": self.type.value,
             "priority": self.priority.value,
@@ -63,6 +92,7 @@ class Notification:
             "data": self.data,
             "dismissed": self.dismissed
         }
+        return self._cached_dict
 
 class NotificationService:
     """
@@ -71,42 +101,77 @@ class NotificationService:
     """
     
     def __init__(self):
-        self.notifications: List[Notification] = []
-        self.notification_history: List[Notification] = []
+        # Active notifications keyed by id, in the order they were added
+        self.notifications: "OrderedDict[str, Notification]" = OrderedDict()
+        # Ring buffer of the last 100 notifications; oldest drop off automatically
+        self.notification_history: "deque[Notification]" = deque(maxlen=100)
         self.last_break_reminder = None
         self.orders_since_break = 0
         self.notification_counter = 0
+        # Service start time keeps ids unique across restarts; the counter
+        # keeps them unique within this run
+        self._id_prefix = f"notif_{int(datetime.now().timestamp())}"
+        # (type, title, message, data signature) -> timestamp of the last one accepted
+        self._last_seen: Dict[tuple, float] = {}
         
     def generate_notification_id(self) -> str:
         """Generate unique notification ID"""
         self.notification_counter += 1
-        return f"notif_{int(datetime.now().timestamp())}_{self.notification_counter}"
+        return f"{self._id_prefix}_{self.notification_counter}"
     
-    def add_notification(self, notification: Notification):
-        """Add a notification to active list"""
-        self.notifications.append(notification)
-        self.notification_history.append(notification)
+    def _is_duplicate(self, notification: Notification) -> bool:
+        """Check the dedup window and record the notification if it's new
         
-        # Keep history limited to last 100
-        if len(self.notification_history) > 100:
-            self.notification_history = self.notification_history[-100:]
+        Timestamps follow the (possibly simulated) clock, so the window is
+        measured in either direction.
+        """
+        key = (notification.type, notification.title, notification.message, _data_signature(notification.data))
+        ts = notification.timestamp.timestamp()
+        last = self._last_seen.get(key)
+        if last is not None and abs(ts - last) < DEDUP_WINDOW_SECONDS:
+            return True
+        self._last_seen[key] = ts
+        return False
+    
+    def add_notification(self, notification: Notification) -> bool:
+        """Add a notification to active list
+        
+        Returns:
+            False if it duplicates one added within DEDUP_WINDOW_SECONDS
+        """
+        if self._is_duplicate(notification):
+            return False
+        self.notifications[notification.id] = notification
+        self.notification_history.append(notification)
+        return True
     
     def dismiss_notification(self, notification_id: str):
         """Dismiss a notification"""
-        for notif in self.notifications:
-            if notif.id == notification_id:
-                notif.dismissed = True
-                self.notifications.remove(notif)
-                break
+        notif = self.notifications.pop(notification_id, None)
+        if notif:
+            notif.dismiss()
+    
+    def dismiss_notifications(self, notification_ids: Iterable[str]):
+        """Dismiss several notifications at once (O(1) per id)"""
+        for notification_id in notification_ids:
+            self.dismiss_notification(notification_id)
     
     def get_active_notifications(self) -> List[Dict]:
         """Get all active notifications as dictionaries"""
-        return [n.to_dict() for n in self.notifications if not n.dismissed]
+        return [n.to_dict() for n in self.notifications.values() if not n.dismissed]
     
     def clear_old_notifications(self, current_time: datetime, max_age_minutes: int = 10):
         """Remove notifications older than specified age"""
         cutoff = current_time.timestamp() - (max_age_minutes * 60)
-        self.notifications = [
-            n for n in self.notifications
-            if n.timestamp.timestamp() > cutoff
+        # Timestamps follow the (possibly simulated) clock and can go backwards,
+        # so every entry is checked; only the expired ones are removed in place
+        expired = [
+            notif_id for notif_id, n in self.notifications.items()
+            if n.timestamp.timestamp() <= cutoff
         ]
+        for notif_id in expired:
+            del self.notifications[notif_id]
+        
+        # Dedup entries past the window can no longer suppress anything
+        dedup_cutoff = current_time.timestamp() - DEDUP_WINDOW_SECONDS
+        self._last_seen = {key: ts for key, ts in self._last_seen.items() if ts > dedup_cutoff}
@@ -1,8 +1,39 @@
 # src/order_builder.py
+import io
+import itertools
 import uuid
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+# Fallback prices when the menu has no modifier schema for a product
+SIZE_PRICES = {
+    "small": 0.0,
+    "medium": 0.50,
+    "large": 1.00,
+    "kids": -0.50,
+}
+
+MODIFIER_PRICES = {
+    "soft top": 0.50,
+    "whipped cream": 0.50,
+    "whip": 0.50,
+    "oat milk": 0.75,
+    "almond milk": 0.75,
+    "coconut milk": 0.75,
+    "boba": 0.75,
+    "caramel drizzle": 0.50,
+    "chocolate drizzle": 0.50,
+    "extra shot": 1.00,
+    "double shot": 2.00,
+}
+
+# Product keys checked when inferring a base price
+_SIZE_MAP_KEYS = ("prices", "size_prices", "price_by_size")
+_VARIANT_KEYS = ("variants", "options", "items")
+
+# Separator line for order summaries
+_RULE = "=" * 60
+
 
 class OrderBuilder:
     """Build complete orders with pricing for POS API"""
@@ -14,6 +45,10 @@ class OrderBuilder:
             menu_loader: MenuLoader instance
         """
         self.menu_loader = menu_loader
+        # product_id -> (flattened modifier options, modifier name -> matched option)
+        self._modifier_index_cache: Dict[str, Tuple[List, Dict]] = {}
+        # (product_id, size) -> inferred base price
+        self._base_price_cache: Dict[Tuple[str, Optional[str]], float] = {}
 
     def build_order(
         self,
@@ -33,15 +68,20 @@ class OrderBuilder:
         """
         order_items: List[Dict] = []
 
+        # Item ids only need to be unique within the order: one random
+        # prefix per order plus a running counter
+        prefix = uuid.uuid4().hex[:8]
+        item_ids = (f"{prefix}-{n}" for n in itertools.count(1))
+
+        subtotal = 0.0
+
         for item in matched_items:
-            order_item = self._build_order_item(item)
+            order_item = self._build_order_item(item, item_ids)
             if order_item:
                 order_items.append(order_item)
-
-        subtotal = sum(
-            float(item.get("unit_price", 0.0)) * int(item.get("quantity", 1))
-            for item in order_items
-        )
+                # unit_price is always a float; placeholder quantities are
+                # passed through as given, hence the int()
+                subtotal += order_item["unit_price"] * int(order_item["quantity"])
 
         order = {
             "source": "broista_copilot",
@@ -49,8 +89,8 @@ class OrderBuilder:
             "notes": notes or "",
             "created_at": datetime.now().isoformat(),
             "items": order_items,
-            "subtotal": round(float(subtotal), 2),
-            "total": round(float(subtotal), 2),  # taxes/discounts can be added later
+            "subtotal": round(subtotal, 2),
+            "total": round(subtotal, 2),  # taxes/discounts can be added later
             "metadata": {
                 "capture_method": "voice_ai",
                 "ai_models": ["whisper", "bedrock_llama3.1"],
@@ -60,8 +100,13 @@ class OrderBuilder:
 
         return order
 
-    def _build_order_item(self, item: Dict) -> Optional[Dict]:
-        """Build single order item with modifiers"""
+    def _build_order_item(self, item: Dict, item_ids: Iterator[str]) -> Optional[Dict]:
+        """Build single order item with modifiers
+
+        Args:
+            item: Matched item from pipeline
+            item_ids: Per-order id generator shared with the modifiers
+        """
         product = item.get('product')
         
         # Handle unknown products
@@ -98,25 +143,28 @@ class OrderBuilder:
         size_price = self._get_size_price(size, modifiers_data)
 
         # Build child modifiers
-        child_items: List[Dict] = []
-        modifier_total = 0.0
-        for modifier_name in item.get("modifiers", []):
-            modifier_item = self._build_modifier_item(modifier_name, modifiers_data)
-            if modifier_item:
-                child_items.append(modifier_item)
-                modifier_total += float(modifier_item.get("unit_price", 0.0))
+        modifier_index = self._get_modifier_index(product_id, modifiers_data)
+        child_items: List[Dict] = [
+            modifier_item
+            for modifier_item in (
+                self._build_modifier_item(modifier_name, modifier_index, item_ids)
+                for modifier_name in item.get("modifiers", [])
+            )
+            if modifier_item
+        ]
+        modifier_total = sum((modifier_item["unit_price"] for modifier_item in child_items), 0.0)
 
         # Resolve base price safely (item-provided → infer from product → fallback)
         base_price = item.get("base_price")
         if not isinstance(base_price, (int, float)) or float(base_price) <= 0:
-            base_price = self._infer_base_price(product, size)
+            base_price = self._infer_base_price(product, product_id, size)
         else:
             base_price = float(base_price)
 
         unit_price = float(base_price) + float(size_price) + float(modifier_total)
 
         order_item = {
-            "item_id": str(uuid.uuid4()),
+            "item_id": next(item_ids),
             "product_id": product_id,
             "name": product_name,
             "category": "drink",
@@ -146,6 +194,7 @@ class OrderBuilder:
         """Get price adjustment for size from modifiers; fallback to defaults"""
         if not size:
             return 0.0
+        size_l = str(size).lower()
 
         # 1) Try from modifiers schema if available
         if modifiers_data and isinstance(modifiers_data, dict):
@@ -153,19 +202,33 @@ class OrderBuilder:
                 if group.get("id") == "size":
                     for option in group.get("options", []):
                         opt_id = (option.get("id") or "").lower()
-                        if opt_id == str(size).lower():
+                        if opt_id == size_l:
                             return float(option.get("price_adjustment", 0.0))
 
         # 2) Fallback mapping
-        size_prices = {
-            "small": 0.0,
-            "medium": 0.50,
-            "large": 1.00,
-            "kids": -0.50,
-        }
-        return float(size_prices.get(str(size).lower(), 0.0))
+        return float(SIZE_PRICES.get(size_l, 0.0))
 
-    def _infer_base_price(self, product: Dict, size: Optional[str]) -> float:
+    def _infer_base_price(self, product: Dict, product_id: str, size: Optional[str]) -> float:
+        """Base price for a product and size, scanned once per pair
+
+        Args:
+            product: Menu product dict
+            product_id: Chain product ID (cache key; empty disables caching)
+            size: Requested size, if any
+
+        Returns:
+            Inferred base price
+        """
+        if not product_id:
+            return self._scan_base_price(product, size)
+        key = (product_id, size)
+        price = self._base_price_cache.get(key)
+        if price is None:
+            price = self._scan_base_price(product, size)
+            self._base_price_cache[key] = price
+        return price
+
+    def _scan_base_price(self, product: Dict, size: Optional[str]) -> float:
         """Best-effort price lookup from common menu schemas, else fallback."""
         if not product:
             return 5.50
@@ -175,20 +238,22 @@ class OrderBuilder:
         if isinstance(price, (int, float)) and price > 0:
             return float(price)
 
+        size_l = str(size).lower() if size else ""
+
         # 2) Dict of size -> price
-        for smap_key in ("prices", "size_prices", "price_by_size"):
+        for smap_key in _SIZE_MAP_KEYS:
             smap = product.get(smap_key)
             if isinstance(smap, dict) and size:
                 p = (
                     smap.get(size)
-                    or smap.get(str(size).lower())
+                    or smap.get(size_l)
                     or smap.get(str(size).title())
                 )
                 if isinstance(p, (int, float)) and p > 0:
                     return float(p)
 
         # 3) Variant/option lists with size + price
-        for key in ("variants", "options", "items"):
+        for key in _VARIANT_KEYS:
             variants = product.get(key)
             if isinstance(variants, list):
                 for v in variants:
@@ -197,7 +262,7 @@ class OrderBuilder:
                     s = (v.get("size") or v.get("name") or "").lower()
                     vp = v.get("price")
                     if (
-                        (not size or (str(size).lower() in s))
+                        (not size or (size_l in s))
                         and isinstance(vp, (int, float))
                         and vp > 0
                     ):
@@ -206,47 +271,63 @@ class OrderBuilder:
         # 4) Fallback
         return 5.50
 
-    def _build_modifier_item(
-        self, modifier_name: str, modifiers_data: Optional[Dict]
-    ) -> Optional[Dict]:
+    def _get_modifier_index(self, product_id: str, modifiers_data: Optional[Dict]) -> Tuple:
+        """Per-product modifier lookup, built once and reused across orders
+
+        Args:
+            product_id: Chain product ID
+            modifiers_data: Modifier chain for the product
+
+        Returns:
+            Tuple of (flattened (lowercased option name, group id, option) list,
+            dict caching the option matched for each lowercased modifier name)
+        """
+        index = self._modifier_index_cache.get(product_id)
+        if index is None:
+            options: List[Tuple[str, Optional[str], Dict]] = []
+            if modifiers_data and isinstance(modifiers_data, dict):
+                for group in modifiers_data.get("groups", []):
+                    for option in group.get("options", []):
+                        options.append(((option.get("name") or "").lower(), group.get("id"), option))
+            index = (options, {})
+            self._modifier_index_cache[product_id] = index
+        return index
+
+    def _build_modifier_item(self, modifier_name: str, modifier_index: Tuple,
+                             item_ids: Iterator[str]) -> Optional[Dict]:
         """Build modifier as child item"""
         name_l = (modifier_name or "").lower()
+        options, matches = modifier_index
 
-        # 1) Try to match against known modifier groups/options
-        if modifiers_data and isinstance(modifiers_data, dict):
-            for group in modifiers_data.get("groups", []):
-                for option in group.get("options", []):
-                    option_name = (option.get("name") or "").lower()
-                    if name_l in option_name or option_name in name_l:
-                        return {
-                            "item_id": str(uuid.uuid4()),
-                            "name": option.get("name"),
-                            "item_type": "modifier",
-                            "modifier_group": group.get("id"),
-                            "quantity": 1,
-                            "unit_price": float(option.get("price_adjustment", 0.0)),
-                            "display_order": 0,
-                        }
+        # 1) Try to match against known modifier groups/options (first match wins;
+        #    the result per name is cached so repeats skip the scan)
+        if name_l in matches:
+            match = matches[name_l]
+        else:
+            match = None
+            for option_name, group_id, option in options:
+                if name_l in option_name or option_name in name_l:
+                    match = (group_id, option)
+                    break
+            matches[name_l] = match
+
+        if match:
+            group_id, option = match
+            return {
+                "item_id": next(item_ids),
+                "name": option.get("name"),
+                "item_type": "modifier",
+                "modifier_group": group_id,
+                "quantity": 1,
+                "unit_price": float(option.get("price_adjustment", 0.0)),
+                "display_order": 0,
+            }
 
         # 2) Fallback price table
-        modifier_prices = {
-            "soft top": 0.50,
-            "whipped cream": 0.50,
-            "whip": 0.50,
-            "oat milk": 0.75,
-            "almond milk": 0.75,
-            "coconut milk": 0.75,
-            "boba": 0.75,
-            "caramel drizzle": 0.50,
-            "chocolate drizzle": 0.50,
-            "extra shot": 1.00,
-            "double shot": 2.00,
-        }
-
-        price = float(modifier_prices.get(name_l, 0.50))
+        price = float(MODIFIER_PRICES.get(name_l, 0.50))
 
         return {
-            "item_id": str(uuid.uuid4()),
+            "item_id": next(item_ids),
             "name": str(modifier_name).title(),
             "item_type": "modifier",
             "modifier_group": "custom",
@@ -269,46 +350,45 @@ class OrderBuilder:
 
     def format_order_summary(self, order: Dict) -> str:
         """Format order as human-readable string"""
-        lines: List[str] = []
-        lines.append("=" * 60)
-        lines.append("📋 ORDER SUMMARY")
-        lines.append("=" * 60)
+        buf = io.StringIO()
+        write = buf.write
+        write(f"{_RULE}\n📋 ORDER SUMMARY\n{_RULE}\n")
 
         for i, item in enumerate(order.get("items", []), 1):
-            lines.append("\n🥤 Item {}: {}".format(i, item.get("name", "Unknown")))
+            write(f"\n🥤 Item {i}: {item.get('name', 'Unknown')}\n")
             if item.get("size"):
-                lines.append("   Size: {}".format(str(item["size"]).title()))
+                write(f"   Size: {str(item['size']).title()}\n")
             if item.get("temperature"):
-                lines.append("   Temperature: {}".format(str(item["temperature"]).title()))
-            lines.append("   Quantity: {}".format(int(item.get("quantity", 1))))
+                write(f"   Temperature: {str(item['temperature']).title()}\n")
+            write(f"   Quantity: {int(item.get('quantity', 1))}\n")
 
             if item.get("child_items"):
-                lines.append("   Modifiers:")
+                write("   Modifiers:\n")
                 for mod in item["child_items"]:
                     mod_price = float(mod.get("unit_price", 0.0))
-                    price_str = " (+${:.2f})".format(mod_price) if mod_price > 0 else ""
-                    lines.append("      • {}{}".format(mod.get("name", "Modifier"), price_str))
+                    price_str = f" (+${mod_price:.2f})" if mod_price > 0 else ""
+                    write(f"      • {mod.get('name', 'Modifier')}{price_str}\n")
 
             breakdown = item.get("pricing_breakdown", {})
             if breakdown:
-                lines.append("   Pricing:")
-                lines.append("      Base: ${:.2f}".format(float(breakdown.get("base_price", 0))))
+                write(f"   Pricing:\n      Base: ${float(breakdown.get('base_price', 0)):.2f}\n")
                 size_adj = float(breakdown.get("size_adjustment", 0))
                 if size_adj != 0:
                     sign = "+" if size_adj > 0 else "-"
-                    lines.append("      Size: {}${:.2f}".format(sign, abs(size_adj)))
+                    write(f"      Size: {sign}${abs(size_adj):.2f}\n")
                 mods_total = float(breakdown.get("modifiers_total", 0))
                 if mods_total > 0:
-                    lines.append("      Mods: +${:.2f}".format(mods_total))
-                lines.append("      Total: ${:.2f}".format(float(breakdown.get("total", 0))))
-
-        lines.append("\n" + ("=" * 60))
-        lines.append("💰 SUBTOTAL: ${:.2f}".format(float(order.get("subtotal", 0.0))))
-        lines.append("💰 TOTAL: ${:.2f}".format(float(order.get("total", 0.0))))
-        lines.append("=" * 60)
-
-        return "\n".join(lines)
+                    write(f"      Mods: +${mods_total:.2f}\n")
+                write(f"      Total: ${float(breakdown.get('total', 0)):.2f}\n")
+
+        write(
+            f"\n{_RULE}\n"
+            f"💰 SUBTOTAL: ${float(order.get('subtotal', 0.0)):.2f}\n"
+            f"💰 TOTAL: ${float(order.get('total', 0.0)):.2f}\n"
+            f"{_RULE}"
+        )
 
+        return buf.getvalue()
 
 def demo_order_builder():
     """Demo the order builder"""
@@ -4,6 +4,8 @@ PRODUCTION: Product name variations
 Maps customer language → actual menu product names
 Only includes products that ACTUALLY EXIST in menu
 """
+import re
+import string
 
 PRODUCT_VARIATIONS = {
     # White chocolate variations
@@ -40,6 +42,26 @@ UNKNOWN_PRODUCTS = {
     'nsh': ['hot cocoa', 'build your own: hot cocoa'],
 }
 
+# Every known phrase in one alternation, longest first so the longest phrase
+# wins at each position; one scan finds them inside a longer utterance
+_PHRASE_RE = re.compile(
+    r"\b(?:"
+    + "|".join(re.escape(p) for p in sorted({**PRODUCT_VARIATIONS, **UNKNOWN_PRODUCTS}, key=len, reverse=True))
+    + r")\b"
+)
+
+# Drops all ASCII punctuation and the trademark marks in menu names in one
+# str.translate call
+_PUNCTUATION = str.maketrans('', '', string.punctuation + '™®©')
+
+# Conversational words allowed around a phrase found inside a longer one;
+# anything else means the phrase is part of a different product name
+_FILLER_WORDS = frozenset({
+    'a', 'an', 'the', 'some', 'one', 'me', 'i', 'id', 'ill', 'im', 'can', 'could',
+    'get', 'have', 'like', 'want', 'would', 'do', 'give', 'lets', 'let', 'just',
+    'please', 'thanks', 'thank', 'you', 'um', 'uh', 'hi', 'hey', 'ok', 'okay', 'yeah',
+})
+
 def resolve_product(customer_phrase: str) -> tuple:
     """Resolve customer phrase to menu product
     
@@ -50,14 +72,26 @@ def resolve_product(customer_phrase: str) -> tuple:
         - suggestions: list of alternatives if doesn't exist
     """
     phrase_lower = customer_phrase.lower().strip()
+    # Keys are already lowercase; punctuation and extra spaces are stripped so
+    # "rainbro rebel!" still hits the dicts without the phrase scan below
+    key = ' '.join(phrase_lower.translate(_PUNCTUATION).split())
     
     # Check if we have a direct mapping
-    if phrase_lower in PRODUCT_VARIATIONS:
-        return (PRODUCT_VARIATIONS[phrase_lower], True, [])
+    if key in PRODUCT_VARIATIONS:
+        return (PRODUCT_VARIATIONS[key], True, [])
     
     # Check if it's a known non-existent product
-    if phrase_lower in UNKNOWN_PRODUCTS:
-        return (phrase_lower, False, UNKNOWN_PRODUCTS[phrase_lower])
+    if key in UNKNOWN_PRODUCTS:
+        return (key, False, UNKNOWN_PRODUCTS[key])
+    
+    # Look for a known phrase inside a longer one ("can i get a rainbro rebel"),
+    # but only when the rest is filler: "caramel hot cocoa" is its own product
+    match = max(_PHRASE_RE.finditer(key), key=lambda m: len(m.group()), default=None)
+    if match and _FILLER_WORDS.issuperset((key[:match.start()] + ' ' + key[match.end():]).split()):
+        best = match.group()
+        if best in PRODUCT_VARIATIONS:
+            return (PRODUCT_VARIATIONS[best], True, [])
+        return (best, False, UNKNOWN_PRODUCTS[best])
     
     # Otherwise return as-is (will be fuzzy matched)
     return (phrase_lower, True, [])
\ No newline at end of file
@@ -4,94 +4,220 @@ PRODUCTION-GRADE ENTITY EXTRACTOR
 Designed for real coffee shop use, not just test cases
 """
 
+import asyncio
 import boto3
+import functools
 import json
 import os
 import re
-from typing import Dict, List, Tuple
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from botocore.config import Config
 from dotenv import load_dotenv
 
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+except ImportError:
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+try:
+    from product_variations import PRODUCT_VARIATIONS, UNKNOWN_PRODUCTS
+except ImportError:
+    PRODUCT_VARIATIONS, UNKNOWN_PRODUCTS = {}, {}
+
 load_dotenv()
 
-class ProductionEntityExtractor:
-    """Production-grade entity extraction with validation and confidence scoring"""
-    
-    def __init__(self, model_id="meta.llama3-1-70b-instruct-v1:0"):
-        """Initialize with best model for accuracy
-        
-        Use 70B model for production (more accurate, worth the latency)
-        Use 8B model for testing (faster)
-        """
-        self.model_id = model_id
-        
-        print(f"⏳ Initializing Production Extractor ({model_id.split('.')[-1]})...")
-        
-        self.bedrock = boto3.client(
-            'bedrock-runtime',
-            region_name=os.getenv('AWS_REGION', 'us-west-2'),
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
-        
-        print("✅ Ready!")
+# Bedrock generations keyed by (model_id, normalized text), shared by all
+# extractor instances; repeats of an utterance skip the round trip
+RESPONSE_CACHE_SIZE = 1024
+_response_cache: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+
+# Shared by every Bedrock client: few quick retries, and a connection pool big
+# enough for concurrent extractions to reuse warm connections
+_BEDROCK_CONFIG = Config(
+    retries={'max_attempts': 2, 'mode': 'standard'},
+    connect_timeout=2,
+    read_timeout=30,
+    max_pool_connections=50
+)
+
+
+@functools.lru_cache(maxsize=4)
+def _get_bedrock_client(region: str, access_key_id: Optional[str], secret_access_key: Optional[str]):
+    """Bedrock runtime client, created once per region and credentials
     
-    def extract_with_confidence(self, text: str, verbose=False) -> Tuple[List[Dict], float]:
-        """Extract entities with overall confidence score
-        
-        Returns:
-            (items, confidence_score)
-        """
-        
-        # Step 1: Extract with chain-of-thought reasoning
-        items_with_reasoning = self._extract_with_reasoning(text, verbose)
-        
-        # Step 2: Validate and score
-        validated_items = self._validate_and_score(items_with_reasoning, text, verbose)
-        
-        # Step 3: Calculate overall confidence
-        if validated_items:
-            avg_confidence = sum(item['confidence'] for item in validated_items) / len(validated_items)
-        else:
-            avg_confidence = 0.0
-        
-        return validated_items, avg_confidence
+    boto3 clients are thread-safe, so every extractor in the process shares it.
+    """
+    return boto3.client(
+        'bedrock-runtime',
+        region_name=region,
+        aws_access_key_id=access_key_id,
+        aws_secret_access_key=secret_access_key,
+        config=_BEDROCK_CONFIG
+    )
+
+
+def _cache_text(text: str) -> str:
+    """Normalized utterance used in response cache keys"""
+    return ' '.join(text.lower().split())
+
+
+def _cache_get(key: Tuple[str, str]) -> Optional[str]:
+    """Cached generation for (model_id, normalized text), if any"""
+    with _response_cache_lock:
+        response = _response_cache.get(key)
+        if response is not None:
+            _response_cache.move_to_end(key)
+        return response
+
+
+def _cache_put(key: Tuple[str, str], response: str):
+    """Store a generation, evicting the least recently used past the cap"""
+    with _response_cache_lock:
+        _response_cache[key] = response
+        if len(_response_cache) > RESPONSE_CACHE_SIZE:
+            _response_cache.popitem(last=False)
+
+# Local parser for simple single-drink orders ("can i get a medium iced
+# golden eagle with soft top"); anything it can't fully account for goes
+# to Bedrock
+_FAST_PATH_RE = re.compile(
+    r"^(?:(?:can|could|may) i (?:get|have|order)|i(?:'ll| will) (?:have|take|get|do)"
+    r"|i(?:'d| would) like|let me (?:get|have)|give me|i want|i need)?\s*"
+    r"(?:(?:a|an|one)\s+)?"
+    r"(?:(?P<size>small|medium|large|kids)\s+)?"
+    r"(?:(?P<temp>hot|iced|blended)\s+)?"
+    r"(?P<product>[a-z][a-z' ]*?)"
+    r"(?:\s+with\s+(?P<mods>[a-z ,]+?))?"
+    r"(?:,?\s+please)?$"
+)
+_FAST_PATH_MOD_SPLIT_RE = re.compile(r"\s*,\s*(?:and\s+)?|\s+and\s+")
+_FAST_PATH_MODIFIERS = frozenset({
+    "soft top", "whip", "whipped cream", "boba", "extra sweet", "sugar free",
+    "oat milk", "almond milk", "coconut milk", "breve", "caramel drizzle",
+    "chocolate drizzle", "extra shot", "double shot", "light ice", "no ice",
+    "extra ice", "double blended",
+})
+# Generic drink words customers use without a flavor ("a small rebel")
+_FAST_PATH_BASE_DRINKS = (
+    "rebel", "latte", "mocha", "americano", "cold brew", "chai", "breve",
+    "lemonade", "freeze", "shake", "hot cocoa", "black tea", "green tea",
+)
+_MENU_NAME_MARKS = str.maketrans('', '', '™®')
+
+# Generation cap for the JSON array the prompt asks for: an item is about
+# 35 tokens, so this leaves room for roughly seven items
+MAX_GEN_LEN = 256
+
+# Utterances per batched Bedrock call; the cap scales with the batch and
+# must stay within Llama's 2048 max_gen_len
+EXTRACT_BATCH_SIZE = 4
+
+# LLM output parsing: the first JSON array of items, or failing that each object
+_JSON_DECODER = json.JSONDecoder()
+_JSON_OBJECT_RE = re.compile(r'\{[^}]*"product"[^}]*\}')
+
+
+def _first_json_array(response: str) -> Optional[List]:
+    """First non-empty JSON array of objects in response, parsed
     
-    def _extract_with_reasoning(self, text: str, verbose: bool) -> List[Dict]:
-        """Use chain-of-thought prompting for better accuracy"""
-        
-        prompt = self._build_chain_of_thought_prompt(text)
-        
+    Decoding stops at the array's own closing bracket, so text the model
+    adds afterwards (notes, stray brackets) is never part of the parse.
+    """
+    start = response.find('[')
+    while start != -1:
         try:
-            import time
-            start = time.time()
-            
-            response = self._call_bedrock(prompt)
-            elapsed = time.time() - start
-            
-            if verbose:
-                print(f"⏱️ Extraction: {elapsed:.2f}s\n")
-                print(f"🤖 Response:\n{response[:800]}...\n")
-            
-            # Parse response
-            items = self._parse_chain_of_thought(response, verbose)
+            parsed, _ = _JSON_DECODER.raw_decode(response, start)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list) and parsed and all(isinstance(p, dict) for p in parsed):
+            return parsed
+        start = response.find('[', start + 1)
+    return None
+
+
+def _read_generation_stream(stream) -> str:
+    """Collect a streamed Llama generation, stopping once it holds an item array
+    
+    Brackets are counted outside JSON strings; whenever they balance again the
+    text so far is checked with _first_json_array, so stray brackets in the
+    reasoning don't end the read early. Without an array the whole stream is
+    read.
+    
+    Args:
+        stream: EventStream body from invoke_model_with_response_stream
+        
+    Returns:
+        Generated text up to the end of the first item array
+    """
+    parts = []
+    depth = 0
+    in_string = False
+    escaped = False
+    
+    try:
+        for event in stream:
+            chunk = event.get('chunk')
+            if not chunk:
+                continue
+            piece = _json_loads(chunk['bytes']).get('generation', '')
+            parts.append(piece)
             
-            return items
+            closed = False
+            for ch in piece:
+                if in_string:
+                    if escaped:
+                        escaped = False
+                    elif ch == '\\':
+                        escaped = True
+                    elif ch == '"':
+                        in_string = False
+                elif ch == '"':
+                    in_string = True
+                elif ch == '[':
+                    depth += 1
+                elif ch == ']' and depth:
+                    depth -= 1
+                    closed = closed or depth == 0
             
-        except Exception as e:
-            print(f"❌ Extraction error: {e}")
-            return []
+            if closed and _first_json_array(''.join(parts)) is not None:
+                break
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            close()
     
-    def _build_chain_of_thought_prompt(self, text: str) -> str:
-        """Advanced prompt with reasoning steps"""
-        
-        return f"""You are an expert barista assistant. Extract order items using step-by-step reasoning.
+    return ''.join(parts)
 
-TASK: Analyze this conversation and extract ALL drink/food items ordered.
 
-CONVERSATION:
-"{text}"
+# Customer nicknames -> product names
+_NICKNAME_MAP = {
+    'rainbro': 'rainbow rebel',
+    'rainbow': 'rainbow rebel',
+    'double rainbro': 'rainbow rebel',
+    'double rainbow': 'rainbow rebel',
+    'wc mocha': 'white chocolate mocha',
+    'nsh': 'not so hot',
+}
+
+# Chitchat words the LLM sometimes returns as products
+_FALSE_POSITIVES = frozenset({'thank', 'please', 'awesome', 'great', 'good', 'fun', 'course'})
 
-REASONING PROCESS:
+# Instructions and few-shot examples, identical for every request; only the
+# conversation is appended after this
+CHAIN_OF_THOUGHT_PREFIX = """You are an expert barista assistant. Extract order items, thinking step by step silently.
+
+TASK: Analyze the conversation at the end and extract ALL drink/food items ordered.
+Your reply is ONLY the JSON array: no reasoning, no explanation, no other text.
+
+REASONING PROCESS (silent, never write it out):
 1. Identify all product mentions (ignore chitchat like "how are you", "thank you")
 2. For each product, determine:
    - Is this a NEW item or a MODIFICATION to previous item?
@@ -109,35 +235,30 @@ EXAMPLES:
 
 Example 1: Simple
 Input: "Can I get a large hot mocha with soft top?"
-Reasoning: One item mentioned - mocha, size large, temp hot, modifier soft top
-Output: [{{"product":"mocha","size":"large","temp":"hot","mods":["soft top"],"qty":1,"is_new_item":true}}]
+Output: [{"product":"mocha","size":"large","temp":"hot","mods":["soft top"],"qty":1,"is_new_item":true}]
 
 Example 2: Multiple items
 Input: "I'll do a medium iced golden eagle and a small rebel with boba"
-Reasoning: Two items - (1) golden eagle medium iced, (2) rebel small with boba
 Output: [
-  {{"product":"golden eagle","size":"medium","temp":"iced","mods":[],"qty":1,"is_new_item":true}},
-  {{"product":"rebel","size":"small","temp":null,"mods":["boba"],"qty":1,"is_new_item":true}}
+  {"product":"golden eagle","size":"medium","temp":"iced","mods":[],"qty":1,"is_new_item":true},
+  {"product":"rebel","size":"small","temp":null,"mods":["boba"],"qty":1,"is_new_item":true}
 ]
 
 Example 3: Modification
 Input: "Can I get a golden eagle? Actually, make that iced please"
-Reasoning: One item - golden eagle, then customer changes to iced (modification)
-Output: [{{"product":"golden eagle","size":null,"temp":"iced","mods":[],"qty":1,"is_new_item":true}}]
+Output: [{"product":"golden eagle","size":null,"temp":"iced","mods":[],"qty":1,"is_new_item":true}]
 
 Example 4: Complex multi-item
 Input: "Large hot white chocolate mocha extra sweet with soft top, medium double blended rainbow rebel with boba, and kids not so hot with whip"
-Reasoning: Three items separated by commas/and - (1) mocha (2) rebel (3) not so hot
 Output: [
-  {{"product":"white chocolate mocha","size":"large","temp":"hot","mods":["extra sweet","soft top"],"qty":1,"is_new_item":true}},
-  {{"product":"rainbow rebel","size":"medium","temp":"blended","mods":["boba","double blended"],"qty":1,"is_new_item":true}},
-  {{"product":"not so hot","size":"kids","temp":null,"mods":["whip"],"qty":1,"is_new_item":true}}
+  {"product":"white chocolate mocha","size":"large","temp":"hot","mods":["extra sweet","soft top"],"qty":1,"is_new_item":true},
+  {"product":"rainbow rebel","size":"medium","temp":"blended","mods":["boba","double blended"],"qty":1,"is_new_item":true},
+  {"product":"not so hot","size":"kids","temp":null,"mods":["whip"],"qty":1,"is_new_item":true}
 ]
 
 Example 5: Modifier addition
 Input: "Medium golden eagle. Can you add oat milk and soft top?"
-Reasoning: One item - golden eagle medium, then customer adds modifiers
-Output: [{{"product":"golden eagle","size":"medium","temp":null,"mods":["oat milk","soft top"],"qty":1,"is_new_item":true}}]
+Output: [{"product":"golden eagle","size":"medium","temp":null,"mods":["oat milk","soft top"],"qty":1,"is_new_item":true}]
 
 CRITICAL RULES:
 1. IGNORE chitchat (greetings, thank you, questions about milk types, etc.)
@@ -151,26 +272,336 @@ CRITICAL RULES:
 9. Each item needs: product, size, temp, mods, qty, is_new_item flag
 
 OUTPUT FORMAT (JSON array only, no explanation):
-[{{"product":"...","size":"...","temp":"...","mods":[...],"qty":1,"is_new_item":true}}]
+[{"product":"...","size":"...","temp":"...","mods":[...],"qty":1,"is_new_item":true}]
+"""
 
-Now extract from the conversation above:"""
+# Output instructions when one prompt carries several numbered conversations
+_BATCH_PROMPT_SUFFIX = """
+OUTPUT FORMAT FOR SEVERAL CONVERSATIONS (one entry per conversation, JSON array only):
+[{"id":1,"items":[{"product":"...","size":"...","temp":"...","mods":[...],"qty":1,"is_new_item":true}]},{"id":2,"items":[]}]
+
+JSON array for the conversations above:"""
+
+
+class ProductionEntityExtractor:
+    """Production-grade entity extraction with validation and confidence scoring"""
     
-    def _call_bedrock(self, prompt: str) -> str:
+    def __init__(self, model_id="meta.llama3-1-8b-instruct-v1:0", product_names=None,
+                 escalation_model_id="meta.llama3-1-70b-instruct-v1:0", escalation_threshold=0.7):
+        """Initialize with a fast model and a stronger one for hard cases
+        
+        Every LLM extraction goes to model_id (8B: fast, cheap) first; only
+        results that look wrong are redone on escalation_model_id (70B:
+        more accurate, worth the latency there).
+        
+        Args:
+            model_id: Bedrock model ID tried first
+            product_names: Optional menu names for the local fast path
+            escalation_model_id: Bedrock model ID for retries (None disables)
+            escalation_threshold: Retry when average confidence is below this
+        """
+        self.model_id = model_id
+        self.escalation_model_id = escalation_model_id
+        self.escalation_threshold = escalation_threshold
+        
+        # Product phrases the local fast path accepts
+        self._fast_path_products = set(_FAST_PATH_BASE_DRINKS)
+        self._fast_path_products.update(PRODUCT_VARIATIONS)
+        self._fast_path_products.update(UNKNOWN_PRODUCTS)
+        for name in product_names or ():
+            self._fast_path_products.add(' '.join(str(name).translate(_MENU_NAME_MARKS).lower().split()))
+        
+        print(f"⏳ Initializing Production Extractor ({model_id.split('.')[-1]})...")
+        
+        self.bedrock = _get_bedrock_client(
+            os.getenv('AWS_REGION', 'us-west-2'),
+            os.getenv('AWS_ACCESS_KEY_ID'),
+            os.getenv('AWS_SECRET_ACCESS_KEY')
+        )
+        
+        print("✅ Ready!")
+    
+    def extract_with_confidence(self, text: str, verbose=False) -> Tuple[List[Dict], float]:
+        """Extract entities with overall confidence score
+        
+        Returns:
+            (items, confidence_score)
+        """
+        
+        # Step 1: Simple single-drink orders are parsed locally
+        fast_result = self._fast_path_result(text, verbose)
+        if fast_result:
+            return fast_result
+        
+        # Step 2: Extract with chain-of-thought reasoning on the fast model
+        items_with_reasoning = self._extract_with_reasoning(text, verbose, self.model_id)
+        
+        return self._score_and_escalate(text, items_with_reasoning, verbose)
+    
+    def extract_batch(self, texts: List[str], verbose=False) -> List[Tuple[List[Dict], float]]:
+        """Extract several utterances, sharing Bedrock calls between them
+        
+        Utterances the fast path or the response cache can't answer go to
+        Bedrock EXTRACT_BATCH_SIZE per prompt, with the batches sent
+        concurrently. Anything missing from a batch answer is retried alone.
+        
+        Args:
+            texts: Utterances to extract
+            verbose: Print debug info
+            
+        Returns:
+            One (items, confidence_score) per text, in order
+        """
+        results: List[Optional[Tuple[List[Dict], float]]] = [None] * len(texts)
+        pending = []
+        
+        for i, text in enumerate(texts):
+            results[i] = self._fast_path_result(text, verbose)
+            if results[i]:
+                continue
+            response = _cache_get((self.model_id, _cache_text(text)))
+            if response is not None:
+                items = self._parse_chain_of_thought(response, verbose)
+                results[i] = self._score_and_escalate(text, items, verbose)
+            else:
+                pending.append(i)
+        
+        batches = [pending[j:j + EXTRACT_BATCH_SIZE] for j in range(0, len(pending), EXTRACT_BATCH_SIZE)]
+        if batches:
+            with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+                answers = list(pool.map(
+                    lambda batch: self._extract_batch_with_reasoning([texts[i] for i in batch], verbose),
+                    batches
+                ))
+            for batch, batch_items in zip(batches, answers):
+                for i, items in zip(batch, batch_items):
+                    if items is None:
+                        items = self._extract_with_reasoning(texts[i], verbose, self.model_id)
+                    results[i] = self._score_and_escalate(texts[i], items, verbose)
+        
+        return results
+    
+    def _fast_path_result(self, text: str, verbose: bool) -> Optional[Tuple[List[Dict], float]]:
+        """(items, confidence) from the local parser, or None to ask Bedrock"""
+        fast_items = self._try_fast_path(text)
+        if not fast_items:
+            return None
+        # The parse accounts for every word, so a nickname ("double rainbro")
+        # is scored as the product it normalizes to, not as a missing word
+        product = fast_items[0]['product']
+        canonical = _NICKNAME_MAP.get(product)
+        if canonical:
+            text = ' '.join(text.lower().split()).replace(product, canonical, 1)
+        validated_items = self._validate_and_score(fast_items, text, verbose)
+        if not validated_items:
+            return None
+        if verbose:
+            print("⚡ Fast path: parsed locally, Bedrock skipped\n")
+        return validated_items, self._average_confidence(validated_items)
+    
+    def _score_and_escalate(self, text: str, items_with_reasoning: List[Dict],
+                            verbose: bool) -> Tuple[List[Dict], float]:
+        """Validate first-tier LLM items, redoing them on the strong model if needed
+        
+        Returns:
+            (items, confidence_score)
+        """
+        # Step 3: Validate and score
+        validated_items = self._validate_and_score(items_with_reasoning, text, verbose)
+        avg_confidence = self._average_confidence(validated_items)
+        
+        # Step 4: Redo on the strong model if the answer looks shaky or every
+        # item was thrown out (chitchat with no items at all stays on 8B)
+        if self.escalation_model_id and self.escalation_model_id != self.model_id:
+            all_filtered = bool(items_with_reasoning) and not validated_items
+            if all_filtered or (validated_items and avg_confidence < self.escalation_threshold):
+                print(f"⬆️ Escalating to {self.escalation_model_id.split('.')[-1]} "
+                      f"(confidence {avg_confidence:.0%})")
+                strong_items = self._validate_and_score(
+                    self._extract_with_reasoning(text, verbose, self.escalation_model_id),
+                    text,
+                    verbose
+                )
+                # Keep the fast model's answer if the strong one came back empty
+                if strong_items:
+                    validated_items = strong_items
+                    avg_confidence = self._average_confidence(strong_items)
+        
+        return validated_items, avg_confidence
+    
+    def _average_confidence(self, items: List[Dict]) -> float:
+        """Mean item confidence (0.0 when there are no items)"""
+        if not items:
+            return 0.0
+        return sum(item['confidence'] for item in items) / len(items)
+    
+    async def extract_with_confidence_async(self, text: str, verbose=False) -> Tuple[List[Dict], float]:
+        """Async version of extract_with_confidence
+        
+        The blocking Bedrock call runs in a worker thread (boto3 clients are
+        thread-safe), so several extractions can be awaited together with
+        asyncio.gather and their round trips overlap.
+        
+        Returns:
+            (items, confidence_score)
+        """
+        return await asyncio.to_thread(self.extract_with_confidence, text, verbose)
+    
+    def _try_fast_path(self, text: str) -> Optional[List[Dict]]:
+        """Parse a simple one-drink order without the LLM
+        
+        Returns:
+            Items in the LLM output format, or None when the utterance needs
+            Bedrock (unknown product or modifier, several items, extra words)
+        """
+        phrase = ' '.join(text.lower().split()).rstrip('.?!')
+        match = _FAST_PATH_RE.match(phrase)
+        if not match:
+            return None
+        
+        size, temp, product = match.group('size', 'temp', 'product')
+        # "hot cocoa": the temperature word may belong to the name
+        if temp and f"{temp} {product}" in self._fast_path_products:
+            product, temp = f"{temp} {product}", None
+        elif product not in self._fast_path_products:
+            return None
+        
+        mods = []
+        if match.group('mods'):
+            mods = _FAST_PATH_MOD_SPLIT_RE.split(match.group('mods'))
+            if not all(mod in _FAST_PATH_MODIFIERS for mod in mods):
+                return None
+        
+        return [{
+            "product": product,
+            "size": size,
+            "temp": temp,
+            "mods": mods,
+            "qty": 1,
+            "is_new_item": True,
+        }]
+    
+    def _extract_with_reasoning(self, text: str, verbose: bool, model_id: str) -> List[Dict]:
+        """Use chain-of-thought prompting for better accuracy"""
+        
+        cache_key = (model_id, _cache_text(text))
+        
+        try:
+            import time
+            start = time.time()
+            
+            response = _cache_get(cache_key)
+            if response is not None and verbose:
+                print("⚡ Cached response")
+            
+            if response is None:
+                prompt = self._build_chain_of_thought_prompt(text)
+                response = self._call_bedrock(prompt, model_id)
+                # Only successful calls are cached; errors raise past this
+                _cache_put(cache_key, response)
+            elapsed = time.time() - start
+            
+            if verbose:
+                print(f"⏱️ Extraction: {elapsed:.2f}s\n")
+                print(f"🤖 Response:\n{response[:800]}...\n")
+            
+            # Parse response
+            items = self._parse_chain_of_thought(response, verbose)
+            
+            return items
+            
+        except Exception as e:
+            print(f"❌ Extraction error: {e}")
+            return []
+    
+    def _extract_batch_with_reasoning(self, texts: List[str], verbose: bool) -> List[Optional[List[Dict]]]:
+        """One first-tier Bedrock call for several utterances
+        
+        Returns:
+            Raw items per text, or None for texts the answer didn't cover
+        """
+        if len(texts) == 1:
+            return [self._extract_with_reasoning(texts[0], verbose, self.model_id)]
+        
+        try:
+            response = self._call_bedrock(
+                self._build_batch_prompt(texts),
+                self.model_id,
+                max_gen_len=min(MAX_GEN_LEN * len(texts), 2048)
+            )
+        except Exception as e:
+            print(f"❌ Batch extraction error: {e}")
+            return [None] * len(texts)
+        
+        if verbose:
+            print(f"🤖 Batch response ({len(texts)} conversations):\n{response[:800]}...\n")
+        
+        by_id = {}
+        for entry in _first_json_array(response) or []:
+            items = entry.get('items')
+            if isinstance(items, list):
+                try:
+                    by_id[int(entry.get('id'))] = [
+                        item for item in items if isinstance(item, dict) and item.get('product')
+                    ]
+                except (TypeError, ValueError):
+                    continue
+        
+        results = []
+        for n, text in enumerate(texts, 1):
+            items = by_id.get(n)
+            if items is not None:
+                # Cached like a single-text answer so repeats skip Bedrock
+                _cache_put((self.model_id, _cache_text(text)), json.dumps(items))
+            results.append(items)
+        return results
+    
+    def _build_batch_prompt(self, texts: List[str]) -> str:
+        """Extraction prompt covering several numbered conversations"""
+        conversations = "\n".join(
+            f'CONVERSATION {n}:\n"{text}"\n' for n, text in enumerate(texts, 1)
+        )
+        return f"{CHAIN_OF_THOUGHT_PREFIX}\n{conversations}{_BATCH_PROMPT_SUFFIX}"
+    
+    def _build_chain_of_thought_prompt(self, text: str) -> str:
+        """Advanced prompt with reasoning steps
+        
+        Everything but the conversation is the fixed CHAIN_OF_THOUGHT_PREFIX,
+        so the bulk of the prompt is byte-identical across calls.
+        """
+        
+        return f"""{CHAIN_OF_THOUGHT_PREFIX}
+CONVERSATION:
+"{text}"
+
+JSON array for the conversation above:"""
+    
+    def _call_bedrock(self, prompt: str, model_id: str, max_gen_len: int = MAX_GEN_LEN) -> str:
         """Call Bedrock with optimal production settings"""
         
-        body = json.dumps({
+        body = _json_dumps({
             "prompt": prompt,
-            "max_gen_len": 800,
+            "max_gen_len": max_gen_len,
             "temperature": 0.00,  # Very low for consistency
             "top_p": 0.9
         })
         
+        # Stream so reading can stop as soon as the item array is complete
+        try:
+            response = self.bedrock.invoke_model_with_response_stream(
+                modelId=model_id,
+                body=body
+            )
+            return _read_generation_stream(response['body'])
+        except Exception as e:
+            print(f"⚠️ Streaming failed ({e}), retrying without streaming")
+        
         response = self.bedrock.invoke_model(
-            modelId=self.model_id,
+            modelId=model_id,
             body=body
         )
         
-        response_body = json.loads(response['body'].read())
+        response_body = _json_loads(response['body'].read())
         return response_body.get('generation', '')
     
     def _parse_chain_of_thought(self, response: str, verbose: bool) -> List[Dict]:
@@ -179,29 +610,23 @@ Now extract from the conversation above:"""
         items = []
         
         # Extract JSON array
-        array_match = re.search(r'\[.*\]', response, re.DOTALL)
-        if array_match:
-            try:
-                json_str = array_match.group(0)
-                parsed = json.loads(json_str)
-                
-                if isinstance(parsed, list):
-                    for item_dict in parsed:
-                        if item_dict.get('product'):
-                            items.append(item_dict)
-                    
-                    if items and verbose:
-                        print(f"✅ Parsed {len(items)} items from reasoning\n")
-                    
-                    return items
-            except Exception as e:
-                if verbose:
-                    print(f"⚠️ JSON parse error: {e}")
+        parsed = _first_json_array(response)
+        if parsed is not None:
+            for item_dict in parsed:
+                if item_dict.get('product'):
+                    items.append(item_dict)
+            
+            if items and verbose:
+                print(f"✅ Parsed {len(items)} items from reasoning\n")
+            
+            return items
+        elif verbose and '[' in response:
+            print("⚠️ No complete JSON array in response")
         
         # Fallback: Extract individual objects
-        for match in re.finditer(r'\{[^}]*"product"[^}]*\}', response):
+        for match in _JSON_OBJECT_RE.finditer(response):
             try:
-                obj = json.loads(match.group(0))
+                obj = _json_loads(match.group(0))
                 if obj.get('product'):
                     items.append(obj)
             except:
@@ -215,19 +640,16 @@ Now extract from the conversation above:"""
         validated = []
         text_lower = original_text.lower()
         
-        # Remove duplicates first
-        items = self._deduplicate(items)
+        # Normalize first so nicknames and field variants dedupe together
+        items = self._deduplicate([self._normalize_item(item) for item in items])
         
-        for item in items:
-            # Normalize
-            normalized = self._normalize_item(item)
-            
+        for normalized in items:
             # Calculate confidence
             confidence = self._calculate_confidence(normalized, text_lower)
             normalized['confidence'] = confidence
             
             # Validation checks
-            is_valid, reason = self._is_valid_item(normalized, text_lower)
+            is_valid, reason = self._is_valid_item(normalized)
             
             if is_valid:
                 validated.append(normalized)
@@ -264,15 +686,7 @@ Now extract from the conversation above:"""
         product = str(product).lower().strip()
         
         # Handle nicknames
-        nickname_map = {
-            'rainbro': 'rainbow rebel',
-            'rainbow': 'rainbow rebel',
-            'double rainbro': 'rainbow rebel',
-            'double rainbow': 'rainbow rebel',
-            'wc mocha': 'white chocolate mocha',
-            'nsh': 'not so hot',
-        }
-        product = nickname_map.get(product, product)
+        product = _NICKNAME_MAP.get(product, product)
         
         return {
             'raw_text': '',
@@ -292,7 +706,8 @@ Now extract from the conversation above:"""
         
         # Check 1: Product appears in text
         if product not in text:
-            # Check if any words appear
+            # Check if any words appear; substring checks so inflected forms
+            # ("golden eagles", "whipped") still count
             product_words = product.split()
             found_words = sum(1 for word in product_words if len(word) > 2 and word in text)
             word_ratio = found_words / max(len(product_words), 1)
@@ -314,7 +729,7 @@ Now extract from the conversation above:"""
         
         return round(confidence, 2)
     
-    def _is_valid_item(self, item: Dict, text: str) -> Tuple[bool, str]:
+    def _is_valid_item(self, item: Dict) -> Tuple[bool, str]:
         """Validate if item is legitimate"""
         
         product = item['product_hint']
@@ -324,8 +739,7 @@ Now extract from the conversation above:"""
             return False, "Product name too short"
         
         # Check 2: Not a common false positive
-        false_positives = ['thank', 'please', 'awesome', 'great', 'good', 'fun', 'course']
-        if product in false_positives:
+        if product in _FALSE_POSITIVES:
             return False, f"False positive: {product}"
         
         # Check 3: Confidence threshold
@@ -335,27 +749,22 @@ Now extract from the conversation above:"""
         return True, "Valid"
     
     def _deduplicate(self, items: List[Dict]) -> List[Dict]:
-        """Remove duplicate items"""
+        """Remove duplicate items (expects _normalize_item output)"""
         
-        seen = []
+        seen: set = set()
         unique = []
         
         for item in items:
             # Create signature
-            product = item.get('product') or item.get('product_name', '')
-            size = item.get('size')
-            temp = item.get('temp') or item.get('temperature')
-            mods = item.get('mods') or item.get('modifiers', [])
-            
             signature = (
-                str(product).lower(),
-                size,
-                temp,
-                tuple(sorted(mods)) if isinstance(mods, list) else ()
+                item['product_hint'],
+                item['size'],
+                item['temperature'],
+                tuple(sorted(item['modifiers']))
             )
             
             if signature not in seen:
-                seen.append(signature)
+                seen.add(signature)
                 unique.append(item)
         
         return unique
@@ -390,14 +799,21 @@ def test_production_extractor():
         ("I'll have a mocha. What sizes do you have? Okay, make it large. Can you add whip?", 1),
     ]
     
-    for text, expected_count in test_cases:
+    async def extract_all():
+        return await asyncio.gather(*(
+            extractor.extract_with_confidence_async(text, verbose=False)
+            for text, _ in test_cases
+        ))
+    
+    # All cases go to Bedrock at once; results are printed in order below
+    results = asyncio.run(extract_all())
+    
+    for (text, expected_count), (items, confidence) in zip(test_cases, results):
         print("="*60)
         print(f"📝 \"{text[:80]}...\"")
         print(f"   Expected: {expected_count} item(s)")
         print("="*60)
         
-        items, confidence = extractor.extract_with_confidence(text, verbose=False)
-        
         print(f"\n✅ Extracted: {len(items)} item(s) (Confidence: {confidence:.0%})\n")
         
         for i, item in enumerate(items, 1):
@@ -0,0 +1,42 @@
+# src/test_product_variations.py
+"""Checks resolve_product against the real menu names"""
+import json
+import os
+
+from product_variations import PRODUCT_VARIATIONS, UNKNOWN_PRODUCTS, resolve_product, _PUNCTUATION
+
+MENU_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'menu', 'menu.json')
+
+
+def _menu_names():
+    with open(MENU_PATH, encoding='utf-8') as f:
+        menu = json.load(f)
+    return sorted({
+        product['name']
+        for category in menu.get('categories', [])
+        for product in category.get('products', [])
+        if product.get('name')
+    })
+
+
+def test_menu_names_are_not_remapped():
+    """A real menu product is never resolved to a different product"""
+    wrong = []
+    for name in _menu_names():
+        key = ' '.join(name.lower().translate(_PUNCTUATION).split())
+        if key in PRODUCT_VARIATIONS or key in UNKNOWN_PRODUCTS:
+            continue
+        resolved, exists, _ = resolve_product(name)
+        if resolved != name.lower().strip() or not exists:
+            wrong.append((name, resolved))
+    assert wrong == []
+
+
+def test_phrase_inside_filler():
+    assert resolve_product("can i get a rainbro rebel please")[0] == 'rainbow rebel'
+    assert resolve_product("i want a not so hot")[1] is False
+
+
+
+def test_trademark_marks_hit_the_dict():
+    assert resolve_product("Golden Eagle®") == ('golden eagle', True, [])
@@ -0,0 +1,31 @@
+# src/test_production_entity_extractor.py
+"""Checks confidence scoring in the production extractor"""
+from production_entity_extractor import ProductionEntityExtractor
+
+
+def _confidence(product_hint: str, text: str) -> float:
+    extractor = ProductionEntityExtractor()
+    item = {
+        'product_hint': product_hint,
+        'size': 'large',
+        'temperature': None,
+        'modifiers': [],
+    }
+    return extractor._calculate_confidence(item, text.lower())
+
+
+def test_plural_product_words_count():
+    """Inflected forms in the utterance still credit the product words"""
+    plural = _confidence('golden eagle breve', "two golden eagles please")
+    singular = _confidence('golden eagle breve', "two golden eagle please")
+    assert plural == singular == 0.77
+
+
+def test_nickname_order_takes_fast_path():
+    """Nickname orders are parsed locally instead of falling through to Bedrock"""
+    extractor = ProductionEntityExtractor()
+    result = extractor._fast_path_result("can i get a large double rainbro", verbose=False)
+    assert result is not None
+    items, confidence = result
+    assert [item['product_hint'] for item in items] == ['rainbow rebel']
+    assert confidence == 1.0